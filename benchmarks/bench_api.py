@@ -0,0 +1,120 @@
+"""Requests per second of the query API, with the server pinned to one core.
+
+Starts `statistik.api` in a child process restricted to a single CPU, waits
+for the warm-up, then drives it from this process over keep-alive
+connections in three phases:
+
+- cold: every request a distinct query, so each one is computed
+- cached: the same queries again, answered from `RESPONSES`
+- not modified: the same queries with `If-None-Match`, answered with 304
+
+    python benchmarks/bench_api.py [--clients N] [--rounds N] [--cpu N]
+"""
+
+import argparse
+import http.client
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def queries():
+    from statistik import einkommen, indikatoren, omi
+
+    paths = []
+    for typ, zone, zustand in itertools.product(omi.TYPEN.values(), omi.ZONEN.values(), omi.ZUSTAENDE.values()):
+        selection = {"typ": typ, "zone": zone, "zustand": zustand}
+        for dataset in ("preise", "mieten"):
+            paths.append(f"/api/omi/{dataset}/average?{urlencode(selection)}")
+            paths.append(f"/api/omi/{dataset}/ranking?{urlencode(selection)}&k=10")
+            paths.append(f"/api/omi/{dataset}/series?{urlencode(selection)}&gemeinde=Bozen&gemeinde=Meran&gemeinde=Brixen")
+        for indicator in indikatoren.INDIKATOREN.values():
+            paths.append(f"/api/indikatoren/{indicator}?{urlencode(selection)}")
+    for column in einkommen.ARTEN.values():
+        paths.append(f"/api/einkommen/gemeinden?art={column}&name=Bozen&name=Meran")
+        paths.append(f"/api/einkommen/regionen?art={column}&name=Lombardia")
+    return paths
+
+
+def wait_for(port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            connection.request("GET", "/api/omi/preise/gemeinden")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("the API did not start")
+
+
+def run(port, paths, clients, etags=None):
+    """Seconds for `clients` threads to fetch `paths` between them; returns (seconds, statuses, etags)."""
+    chunks = [paths[i::clients] for i in range(clients)]
+    statuses, found = [], {}
+    lock = threading.Lock()
+
+    def client(chunk):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        for path in chunk:
+            headers = {"If-None-Match": etags[path]} if etags and etags[path] else {}
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            with lock:
+                statuses.append(response.status)
+                found[path] = response.getheader("ETag")
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, statuses, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5, help="repetitions of the cached phases")
+    parser.add_argument("--cpu", type=int, default=0, help="CPU the server is pinned to")
+    parser.add_argument("--port", type=int, default=8599)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "statistik.api", "--port", str(args.port)],
+        cwd=ROOT,
+        preexec_fn=lambda: os.sched_setaffinity(0, {args.cpu}),
+    )
+    try:
+        wait_for(args.port)
+        paths = queries()
+        print(f"{len(paths)} distinct queries, {args.clients} clients, server on CPU {args.cpu}")
+
+        seconds, statuses, etags = run(args.port, paths, args.clients)
+        print(f"{'cold':<14} {len(paths) / seconds:>8.0f} req/s  status {sorted(set(statuses))}")
+
+        for name, conditional in (("cached", None), ("not modified", etags)):
+            rates = []
+            for _ in range(args.rounds):
+                seconds, statuses, _ = run(args.port, paths, args.clients, conditional)
+                rates.append(len(paths) / seconds)
+            print(f"{name:<14} {statistics.median(rates):>8.0f} req/s  status {sorted(set(statuses))}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
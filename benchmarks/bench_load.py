@@ -0,0 +1,60 @@
+"""Compare loading the bundled datasets from xlsx and from their Arrow snapshots.
+
+    python benchmarks/bench_load.py [--repeat N] [--json results.json]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from statistik import data, snapshot  # noqa: E402
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for name in data.DATASETS:
+        src = data.DATA_DIR / f"{name}.xlsx"
+        version = data.snapshot_version()
+        if not snapshot.is_fresh(name, src, version):
+            snapshot.convert(name)
+        row = {
+            "dataset": name,
+            "xlsx_s": timed(lambda: pd.read_excel(src), args.repeat),
+            "snapshot_s": timed(lambda: snapshot.read(name, src, version=version), args.repeat),
+        }
+        row["speedup"] = row["xlsx_s"] / row["snapshot_s"]
+        results.append(row)
+
+    print(f"{'dataset':<12} {'xlsx':>10} {'snapshot':>10} {'speedup':>8}")
+    for row in results:
+        print(f"{row['dataset']:<12} {row['xlsx_s'] * 1000:>8.1f}ms {row['snapshot_s'] * 1000:>8.1f}ms "
+              f"{row['speedup']:>7.0f}x")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Rerun latency of the three pages, measured headlessly with Streamlit's AppTest.
+
+Every page is driven through the combinations of its selectboxes: all
+(type, zone, condition) combinations with a sample of Gemeinde triples on the
+OMI pages, every income type with a sample of region and Gemeinde triples on
+the income page. Each page runs in its own interpreter so that its peak memory
+and first (cold) run are not shared with the others.
+
+    python benchmarks/bench_pages.py [--triples N] [--out results.json] [--compare old.json]
+
+The results are written as JSON (by default to benchmarks/results/pages-<commit>.json)
+so runs of different commits can be compared with --compare.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PAGES = ("Immobilienpreise.py", "pages/Mietpreise.py", "pages/Einkommen.py")
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def sample_triples(options, n, rng):
+    """The default triple (first three options) and `n` random ordered triples."""
+    if len(options) < 3:
+        return []
+    triples = [tuple(options[:3])]
+    for _ in range(n):
+        triples.append(tuple(rng.sample(options, 3)))
+    return triples
+
+
+def omi_steps(page, n, rng):
+    """(selectbox values, rows processed) per rerun of an OMI page."""
+    from statistik import cube, omi
+
+    dataset = omi.PREISE if page == "Immobilienpreise.py" else omi.MIETEN
+    data_cube = cube.get(dataset.name)
+    for typ, zone, zustand in itertools.product(omi.TYPEN, omi.ZONEN, omi.ZUSTAENDE):
+        selection = (omi.TYPEN[typ], omi.ZONEN[zone], omi.ZUSTAENDE[zustand])
+        rows = len(data_cube.frame(*selection))
+        yield {0: typ, 1: zone, 2: zustand}, rows
+        for triple in sample_triples(omi.gemeinden(dataset, *selection), n, rng):
+            yield {3: triple[0], 4: triple[1], 5: triple[2]}, rows
+
+
+def income_steps(n, rng):
+    """(selectbox values, rows processed) per rerun of the income page."""
+    from statistik import einkommen
+
+    for selectbox, level in ((0, einkommen.REGIONEN), (4, einkommen.GEMEINDEN)):
+        table = einkommen.wide(level)
+        for label, column in einkommen.ARTEN.items():
+            yield {selectbox: label}, 0
+            for triple in sample_triples(einkommen.entities(level), n, rng):
+                names = einkommen.selection(level, triple)
+                rows = int(table[column][list(names)].count().sum())
+                yield {selectbox + 1: triple[0], selectbox + 2: triple[1], selectbox + 3: triple[2]}, rows
+
+
+def run_page(page, n, seed):
+    """Drive one page through its combinations; runs inside the worker process."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(str(ROOT / page), default_timeout=300)
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+
+    steps = income_steps(n, rng) if page.endswith("Einkommen.py") else omi_steps(page, n, rng)
+    samples = []
+    rows_processed = 0
+    errors = 0
+    for values, rows in steps:
+        for index, value in values.items():
+            at.selectbox[index].set_value(value)
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+        rows_processed += rows
+        if at.exception:
+            errors += 1
+
+    return {
+        "page": page,
+        "reruns": len(samples),
+        "errors": errors,
+        "first_run_ms": first_run * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "max_ms": max(samples) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rows_processed": rows_processed,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results, previous=None):
+    before = {row["page"]: row for row in (previous or {}).get("pages", [])}
+    print(f"{'page':<22} {'reruns':>6} {'p50':>9} {'p95':>9} {'first':>9} {'rss':>8} {'rows':>10}")
+    for row in results["pages"]:
+        print(f"{row['page']:<22} {row['reruns']:>6} {row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms "
+              f"{row['first_run_ms']:>7.0f}ms {row['peak_rss_mb']:>6.0f}MB {row['rows_processed']:>10}")
+        old = before.get(row["page"])
+        if old:
+            print(f"{'':<22} {'':>6} {row['p50_ms'] / old['p50_ms'] - 1:>+8.0%} {row['p95_ms'] / old['p95_ms'] - 1:>+8.0%} "
+                  f"{row['first_run_ms'] / old['first_run_ms'] - 1:>+8.0%} {row['peak_rss_mb'] / old['peak_rss_mb'] - 1:>+7.0%}"
+                  f"   vs {previous['commit']}")
+        if row["errors"]:
+            print(f"{'':<22} {row['errors']} reruns raised an exception")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--triples", type=int, default=3, help="random triples per selection (default 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path)
+    parser.add_argument("--compare", type=Path, help="results of an earlier run to compare against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_page(args.worker, args.triples, args.seed), sys.stdout)
+        return
+
+    pages = []
+    for page in args.pages:
+        worker = subprocess.run(
+            [sys.executable, __file__, "--worker", page, "--triples", str(args.triples), "--seed", str(args.seed)],
+            capture_output=True, text=True, check=True,
+        )
+        pages.append(json.loads(worker.stdout))
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "triples": args.triples,
+        "seed": args.seed,
+        "pages": pages,
+    }
+    out = args.out or RESULTS_DIR / f"pages-{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    print_results(results, previous)
+    print(f"written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Memory held per additional session, with all sessions sharing one copy of the data.
+
+Opens N headless sessions of a page in one process (like N browser tabs on one
+server) and keeps them all alive, measuring with tracemalloc how much memory
+the shared datasets take and how much each further session adds.
+
+    python benchmarks/bench_sessions.py [--sessions N] [--page Immobilienpreise.py]
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def current():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--page", default="Immobilienpreise.py")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    from streamlit.testing.v1 import AppTest
+
+    from statistik import cube, data, schema, warmup
+
+    before_data = current()
+    warmup.warm_up()
+    shared = current() - before_data
+    private = sum(schema.memory_usage(data.load(name)) for name in data.DATASETS)
+
+    sessions = []
+    sizes = [current()]
+    for i in range(args.sessions):
+        at = AppTest.from_file(str(ROOT / args.page), default_timeout=120)
+        # Every session looks at a different selection
+        at.run()
+        if len(at.selectbox) > 3:
+            options = at.selectbox[3].options
+            at.selectbox[3].set_value(options[i % len(options)]).run()
+        sessions.append(at)
+        sizes.append(current())
+
+    per_session = [after - before for before, after in zip(sizes, sizes[1:])]
+    print(f"shared data (frames, cubes, aggregates): {shared / 1e6:8.2f} MB, held once per process")
+    print(f"  of which the frames alone:             {private / 1e6:8.2f} MB, previously held by every session")
+    print(f"first session:                           {per_session[0] / 1e6:8.2f} MB")
+    print(f"each further session (median of {len(per_session) - 1}):    {statistics.median(per_session[1:]) / 1e6:8.2f} MB")
+    print(f"cubes are read-only: {not cube.get('preise_df').values.flags.writeable}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import streamlit as st
+
+from statistik import charts, indikatoren, instrument, omi, warmup
+
+
+st.set_page_config(page_title="Kennzahlen Südtirol", page_icon=":bar_chart:", layout="centered")
+warmup.start()
+instrument.begin("Indikatoren")
+
+
+st.title("Mietrendite und Leistbarkeit in Südtiroler Gemeinden")
+st.markdown("Diese Seite verbindet die Verkaufspreise und Mietpreise des OMI mit den durchschnittlichen Einkommen pro Steuererklärung.")
+st.markdown("Die **Bruttomietrendite** ist die Jahresmiete (zwölf mittlere Monatsmieten pro Quadratmeter) in Prozent des mittleren Verkaufspreises pro Quadratmeter. Kosten, Steuern und Leerstand sind nicht berücksichtigt.")
+st.markdown(f"Das **Preis-Einkommen-Verhältnis** gibt an, wie viele durchschnittliche Jahreseinkommen eine Immobilie mit {indikatoren.REFERENZ_M2} m² zum mittleren Verkaufspreis kostet. Einkommensdaten sind nur für die Jahre vorhanden, die das Ministerium veröffentlicht hat.")
+
+
+st.markdown("<div style='margin: 50px;'></div>", unsafe_allow_html=True)
+
+
+indikator = st.selectbox("Kennzahl", tuple(indikatoren.INDIKATOREN), index=0)
+
+st.subheader("Wählen Sie den Typ der Immobilie")
+col1, col2, col3 = st.columns(3)
+with col1:
+    typ_immobilie = st.selectbox("Art der Immobilie", tuple(omi.TYPEN), index=0)
+with col2:
+    zone = st.selectbox("Zone der Immobilie", tuple(omi.ZONEN), index=0)
+with col3:
+    zustand = st.selectbox("Zustand der Immobilie", tuple(omi.ZUSTAENDE), index=0)
+
+typ_immobilie = omi.TYPEN[typ_immobilie]
+zone = omi.ZONEN[zone]
+zustand = omi.ZUSTAENDE[zustand]
+spalte = indikatoren.INDIKATOREN[indikator]
+
+
+indicator_cube = indikatoren.get()
+with instrument.span("filter"):
+    jahre = indicator_cube.years_with_data(typ_immobilie, zone, zustand, spalte)
+
+if not jahre:
+    st.info("Für diese Auswahl gibt es keine Werte.")
+else:
+    jahr = st.selectbox("Jahr", jahre, index=len(jahre) - 1)
+
+    with instrument.span("rankings"):
+        ranking = indicator_cube.ranking(typ_immobilie, zone, zustand, spalte, jahr)
+
+    st.subheader(f"{indikator} {jahr}")
+    gemeinden = st.multiselect("Gemeinden im Zeitverlauf", ranking.index.tolist(), default=ranking.index[:3].tolist())
+    if gemeinden:
+        fig = charts.indicator_figure(indikator, typ_immobilie, zone, zustand, gemeinden)
+        with instrument.span("plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        ranking.rename(indikator).rename_axis("Gemeinde").reset_index(),
+        hide_index=True,
+        use_container_width=True,
+    )
+
+instrument.finish()
@@ -0,0 +1,48 @@
+import streamlit as st
+
+from statistik import charts, geometrie, instrument, karte, omi, warmup
+
+
+st.set_page_config(page_title="Karte Südtirol", page_icon=":bar_chart:", layout="centered")
+warmup.start()
+instrument.begin("Karte")
+
+
+st.title("Karte der Südtiroler Gemeinden")
+st.markdown("Die Karte färbt alle Gemeinden nach der gewählten Kennzahl ein. Gemeinden ohne Wert für die Auswahl bleiben weiß.")
+st.markdown("Gemeindegrenzen: [Openpolis](https://github.com/openpolis/geojson-italy) (CC BY 4.0), vereinfacht.")
+
+
+kennzahl = st.selectbox("Kennzahl", tuple(karte.KENNZAHLEN), index=0)
+
+st.subheader("Wählen Sie den Typ der Immobilie")
+col1, col2, col3 = st.columns(3)
+with col1:
+    typ_immobilie = st.selectbox("Art der Immobilie", tuple(omi.TYPEN), index=0)
+with col2:
+    zone = st.selectbox("Zone der Immobilie", tuple(omi.ZONEN), index=0)
+with col3:
+    zustand = st.selectbox("Zustand der Immobilie", tuple(omi.ZUSTAENDE), index=0)
+
+typ_immobilie = omi.TYPEN[typ_immobilie]
+zone = omi.ZONEN[zone]
+zustand = omi.ZUSTAENDE[zustand]
+
+
+with instrument.span("filter"):
+    jahre = karte.years(kennzahl, typ_immobilie, zone, zustand)
+
+if not jahre:
+    st.info("Für diese Auswahl gibt es keine Werte.")
+else:
+    col1, col2 = st.columns(2)
+    with col1:
+        jahr = st.selectbox("Jahr", jahre, index=len(jahre) - 1)
+    with col2:
+        detail = st.radio("Detailgrad der Grenzen", tuple(geometrie.LEVELS), index=1, horizontal=True)
+
+    fig = charts.map_figure(kennzahl, typ_immobilie, zone, zustand, jahr, detail)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+instrument.finish()
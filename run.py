@@ -0,0 +1,25 @@
+"""Start the app with all datasets loaded and indexed before the first session.
+
+    python run.py [streamlit options]
+
+Equivalent to `streamlit run Immobilienpreise.py`, except that the warm-up
+starts before the server accepts connections. With `STATISTIK_API_PORT` set,
+the query API of `statistik.api` runs in the same process on that port and
+shares the loaded data with the pages.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from streamlit.web import cli
+
+from statistik import api, warmup
+
+
+if __name__ == "__main__":
+    warmup.start()
+    if os.environ.get("STATISTIK_API_PORT"):
+        api.serve_in_background(port=int(os.environ["STATISTIK_API_PORT"]))
+    sys.argv = ["streamlit", "run", str(Path(__file__).resolve().parent / "Immobilienpreise.py"), *sys.argv[1:]]
+    sys.exit(cli.main())
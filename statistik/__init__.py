@@ -0,0 +1 @@
+"""Shared data access and computation for the Südtirol statistics pages."""
@@ -0,0 +1,291 @@
+"""JSON/CSV query service over the data of the pages.
+
+A small HTTP server from the standard library that answers with what the
+pages compute, from the same loaders, cubes and caches:
+
+    GET /api/omi/<preise|mieten>/gemeinden?typ=20&zone=B&zustand=NORMALE
+    GET /api/omi/<preise|mieten>/series?typ=20&zone=B&zustand=NORMALE&gemeinde=Bozen&gemeinde=Meran
+    GET /api/omi/<preise|mieten>/average?typ=20&zone=B&zustand=NORMALE
+    GET /api/omi/<preise|mieten>/ranking?typ=20&zone=B&zustand=NORMALE&jahr=2023&k=10&order=bottom&spanne=5
+    GET /api/einkommen/<regionen|gemeinden>?art=medio_totale&name=Bozen&name=Meran
+    GET /api/indikatoren/<rendite|...>?typ=20&zone=B&zustand=NORMALE&jahr=2023
+
+Rankings are by the middle value, or with `spanne=N` by its average annual
+growth over N years. Every OMI query also takes `halbjahre=beide`. Selectors
+default to the first entry of the selectboxes. Results are JSON records, or
+CSV with `format=csv` or `Accept: text/csv`.
+
+Responses are kept in `RESPONSES`, keyed by the query and the versions of the
+datasets it reads, and carry an ETag (a hash of the body). A request with a
+matching `If-None-Match` is answered with 304 and no body.
+
+    python -m statistik.api [--host 127.0.0.1] [--port 8502]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from statistik import cube, data, einkommen, indikatoren, instrument, omi, warmup
+from statistik.cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+RESPONSES = LRUCache(maxsize=1024)
+
+OMI_DATASETS = {"preise": omi.PREISE, "mieten": omi.MIETEN}
+EINKOMMEN_LEVELS = {"regionen": einkommen.REGIONEN, "gemeinden": einkommen.GEMEINDEN}
+
+DEFAULTS = {
+    "typ": str(next(iter(omi.TYPEN.values()))),
+    "zone": next(iter(omi.ZONEN.values())),
+    "zustand": next(iter(omi.ZUSTAENDE.values())),
+}
+
+
+class QueryError(ValueError):
+    """A query the service cannot answer; reported to the client with `status`."""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+def _one(query, name, default=None):
+    values = query.get(name)
+    if not values:
+        if default is None:
+            raise QueryError(f"missing parameter {name!r}")
+        return default
+    return values[-1]
+
+
+def _choice(value, allowed, name):
+    if value not in allowed:
+        raise QueryError(f"{name}={value!r} is not one of {', '.join(map(str, allowed))}")
+    return value
+
+
+def _selection(query):
+    try:
+        cod_tip = int(_one(query, "typ", DEFAULTS["typ"]))
+    except ValueError:
+        raise QueryError("typ must be an OMI type code such as 20") from None
+    return (
+        _choice(cod_tip, tuple(omi.TYPEN.values()), "typ"),
+        _choice(_one(query, "zone", DEFAULTS["zone"]), tuple(omi.ZONEN.values()), "zone"),
+        _choice(_one(query, "zustand", DEFAULTS["zustand"]), tuple(omi.ZUSTAENDE.values()), "zustand"),
+    )
+
+
+def _year(value):
+    # Years are ints, half-years labels such as "2023/1"
+    return int(value) if value.isdigit() else value
+
+
+def _lookup(table, key, kind):
+    if key not in table:
+        raise QueryError(f"unknown {kind} {key!r}", HTTPStatus.NOT_FOUND)
+    return table[key]
+
+
+def _omi(parts, query):
+    dataset = _lookup(OMI_DATASETS, parts[0], "dataset")
+    selection = _selection(query)
+    both_semesters = query.get("halbjahre", [""])[-1] == "beide"
+    kind = parts[1] if len(parts) > 1 else ""
+    if kind == "gemeinden":
+        frame = pd.DataFrame({"gemeinde_de": omi.gemeinden(dataset, *selection, both_semesters)})
+    elif kind == "series":
+        chosen = query.get("gemeinde")
+        if not chosen:
+            raise QueryError("missing parameter 'gemeinde'")
+        frame = omi.compare(dataset, *selection, chosen, both_semesters=both_semesters).table
+    elif kind == "average":
+        frame = omi.compare(dataset, *selection, (), both_semesters=both_semesters).average
+    elif kind == "ranking":
+        order = _choice(_one(query, "order", "top"), ("top", "bottom"), "order")
+        try:
+            k = int(_one(query, "k", "5"))
+        except ValueError:
+            raise QueryError("k must be an integer") from None
+        if k < 1:
+            raise QueryError("k must be at least 1")
+        span = query.get("spanne")
+        try:
+            span = int(span[-1]) if span else None
+        except ValueError:
+            raise QueryError("spanne must be a number of years") from None
+        if span is not None and both_semesters:
+            raise QueryError("spanne needs whole years and cannot be combined with halbjahre=beide")
+        if span is not None:
+            # Longer spans have no base year; each span also keeps its growth rates in the cube
+            longest = len(cube.get(dataset.name).years) - 1
+            if not 1 <= span <= longest:
+                raise QueryError(f"spanne must be between 1 and {longest}")
+        year = query.get("jahr")
+        try:
+            result = omi.ranking(dataset, *selection, _year(year[-1]) if year else None, k, span, both_semesters)
+        except (KeyError, ValueError) as exc:
+            raise QueryError(exc.args[0], HTTPStatus.NOT_FOUND) from None
+        frame = (result.top if order == "top" else result.bottom).assign(Jahr=str(result.year))
+    else:
+        raise QueryError(f"unknown query {kind!r}", HTTPStatus.NOT_FOUND)
+    return frame
+
+
+def _einkommen(parts, query):
+    level = _lookup(EINKOMMEN_LEVELS, parts[0], "level")
+    art = _one(query, "art", "medio_totale")
+    column = einkommen.ARTEN.get(art, art)
+    _choice(column, tuple(einkommen.ARTEN.values()), "art")
+    names = einkommen.selection(level, query.get("name", ()))
+    return einkommen.series(level, column, names).reset_index()
+
+
+def _indikatoren(parts, query):
+    indicator = _lookup({column: column for column in indikatoren.INDIKATOREN.values()}, parts[0], "indicator")
+    selection = _selection(query)
+    indicator_cube = indikatoren.get()
+    year = query.get("jahr")
+    if year:
+        year = _year(year[-1])
+    else:
+        years = indicator_cube.years_with_data(*selection, indicator)
+        if not years:
+            raise QueryError("no values for this selection", HTTPStatus.NOT_FOUND)
+        year = years[-1]
+    try:
+        ranking = indicator_cube.ranking(*selection, indicator, year)
+    except KeyError as exc:
+        raise QueryError(exc.args[0], HTTPStatus.NOT_FOUND) from None
+    return ranking.rename(indicator).reset_index().assign(Anno=year)
+
+
+ROUTES = {
+    "omi": _omi,
+    "einkommen": _einkommen,
+    "indikatoren": _indikatoren,
+}
+
+
+def _encode(frame, fmt):
+    if fmt == "csv":
+        return frame.to_csv(index=False).encode(), "text/csv; charset=utf-8"
+    return frame.to_json(orient="records", force_ascii=False).encode(), "application/json"
+
+
+def _normalized(query):
+    # The order of the parameters does not change the answer; repeated values keep
+    # their order, which is the column order of a series
+    return tuple(sorted((name, tuple(values)) for name, values in query.items()))
+
+
+def _error(exc):
+    return exc.status, json.dumps({"error": str(exc)}).encode(), "application/json", None
+
+
+def respond(path, query, fmt):
+    """(status, body, content type, ETag) of a query, from `RESPONSES` if possible.
+
+    Queries that cannot be answered get an error status and no ETag; they are
+    cached as well, a client polling an empty selection costs one lookup.
+    """
+    parts = [part for part in path.split("/") if part]
+    if len(parts) < 3 or parts[0] != "api" or parts[1] not in ROUTES:
+        return _error(QueryError(f"unknown path {path!r}", HTTPStatus.NOT_FOUND))
+    route = ROUTES[parts[1]]
+    # The versions of every dataset make entries of replaced data unreachable
+    versions = tuple(data.version(name) for name in data.DATASETS)
+    key = (tuple(parts), _normalized(query), fmt, versions)
+
+    def build():
+        try:
+            with instrument.span("query"):
+                frame = route(parts[2:], query)
+                body, content_type = _encode(frame, fmt)
+        except QueryError as exc:
+            return _error(exc)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        return HTTPStatus.OK, body, content_type, etag
+
+    return RESPONSES.get_or_create(key, build)
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "statistik-api"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle's algorithm a keep-alive
+    # client waits for the delayed ACK of the headers before it gets the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        fmt = query.pop("format", [None])[-1]
+        if fmt is None:
+            fmt = "csv" if "text/csv" in self.headers.get("Accept", "") else "json"
+        if fmt not in ("json", "csv"):
+            status, body, content_type, etag = _error(QueryError(f"format={fmt!r} is not one of json, csv"))
+        else:
+            status, body, content_type, etag = respond(url.path, query, fmt)
+
+        if etag and etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self._send(HTTPStatus.NOT_MODIFIED, b"", None, etag)
+        else:
+            self._send(status, body, content_type, etag)
+
+    def _send(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+            # Clients may keep the answer but must revalidate it, the data can be replaced
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s " + format, self.address_string(), *args)
+
+
+def server(host="127.0.0.1", port=8502):
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve_in_background(host="127.0.0.1", port=8502):
+    """Start the service in a daemon thread of this process, next to the Streamlit server."""
+    httpd = server(host, port)
+    threading.Thread(target=httpd.serve_forever, name="statistik-api", daemon=True).start()
+    logger.info("query API on http://%s:%d/api/", host, httpd.server_address[1])
+    return httpd
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    warmup.start()
+    httpd = server(args.host, args.port)
+    logger.info("query API on http://%s:%d/api/", args.host, args.port)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""One-page report per Gemeinde: sale prices, rents, incomes and indicators.
+
+The reports show what the pages show for one Gemeinde against the average of
+all Gemeinden, built with the same functions (`omi.compare`,
+`einkommen.series`, `indikatoren.get` and the charts of `statistik.charts`).
+
+All datasets are loaded and their cubes built once in the parent process;
+the worker processes are forked from it and share that memory instead of
+reading the data again. Each worker renders the reports of one Gemeinde at a
+time as HTML, and as PNG with `--png` if `kaleido` is installed. plotly.js is
+written once next to the reports instead of into every file.
+
+    python -m statistik.berichte [--out berichte] [--workers N] [--png] [Gemeinde ...]
+"""
+
+import argparse
+import html
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from statistik import charts, cube, einkommen, gemeinden, indikatoren, omi, warmup
+
+
+OUT_DIR = Path("berichte")
+
+# Selection of the reports: the first entry of the selectboxes, except that
+# the zone falls back to the next one in which the Gemeinde has values
+TYP = omi.TYPEN["Privatwohnungen"]
+ZUSTAND = omi.ZUSTAENDE["Normal"]
+EINKOMMEN = "Gesamtes steuerpflichtiges Einkommen"
+
+_png = False
+_out_dir = OUT_DIR
+
+
+def _zone(dataset, gemeinde):
+    data_cube = cube.get(dataset.name)
+    for label, fascia in omi.ZONEN.items():
+        if gemeinde in data_cube.members(TYP, fascia, ZUSTAND):
+            return label, fascia
+    return None, None
+
+
+def figures(gemeinde):
+    """(title, figure) of the charts of the report of `gemeinde`."""
+    result = []
+    for dataset in (omi.PREISE, omi.MIETEN):
+        label, fascia = _zone(dataset, gemeinde)
+        if fascia is None:
+            continue
+        comparison = omi.compare(dataset, TYP, fascia, ZUSTAND, [gemeinde])
+        if comparison.table.empty:
+            continue
+        result.append((f"{dataset.value_label}, Privatwohnungen, Zone {label}", charts.line_chart(comparison, dataset)))
+
+    column = einkommen.ARTEN[EINKOMMEN]
+    table = einkommen.series(einkommen.GEMEINDEN, column, einkommen.selection(einkommen.GEMEINDEN, [gemeinde]))
+    if gemeinde in table.columns:
+        result.append((EINKOMMEN, charts.income_chart(table, f"Vergleich: {EINKOMMEN}", einkommen.GEMEINDEN.legend_title)))
+    return result
+
+
+def indicators(gemeinde):
+    """(indicator, year, value, rank, of) of the latest year of each indicator."""
+    label_zone, fascia = _zone(omi.PREISE, gemeinde)
+    if fascia is None:
+        return []
+    indicator_cube = indikatoren.get()
+    rows = []
+    for label, column in indikatoren.INDIKATOREN.items():
+        years = indicator_cube.years_with_data(TYP, fascia, ZUSTAND, column)
+        if not years:
+            continue
+        ranking = indicator_cube.ranking(TYP, fascia, ZUSTAND, column, years[-1])
+        if gemeinde in ranking.index:
+            rank = ranking.index.get_loc(gemeinde) + 1
+            rows.append((f"{label}, Zone {label_zone}", years[-1], ranking[gemeinde], rank, len(ranking)))
+    return rows
+
+
+def render(gemeinde, out_dir, png=False):
+    """Write the report of `gemeinde` to `out_dir`; returns the path of the HTML file."""
+    parts = [f"<h1>{html.escape(gemeinde)}</h1>"]
+    stem = gemeinde.replace("/", "-").replace(" ", "_")
+    for i, (title, fig) in enumerate(figures(gemeinde)):
+        parts.append(f"<h2>{html.escape(title)}</h2>")
+        parts.append(fig.to_html(full_html=False, include_plotlyjs=False))
+        if png:
+            fig.write_image(out_dir / f"{stem}_{i + 1}.png", width=900, height=500)
+
+    rows = indicators(gemeinde)
+    if rows:
+        parts.append("<h2>Kennzahlen</h2><table><tr><th>Kennzahl</th><th>Jahr</th><th>Wert</th><th>Rang</th></tr>")
+        for label, year, value, rank, of in rows:
+            parts.append(f"<tr><td>{html.escape(label)}</td><td>{year}</td><td>{value:.2f}</td><td>{rank} von {of}</td></tr>")
+        parts.append("</table>")
+
+    path = out_dir / f"{stem}.html"
+    path.write_text(
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{html.escape(gemeinde)}</title><script src='plotly.min.js'></script></head>"
+        f"<body>{''.join(parts)}</body></html>",
+        encoding="utf-8",
+    )
+    return path
+
+
+def _init_worker(out_dir, png):
+    global _out_dir, _png
+    _out_dir, _png = out_dir, png
+
+
+def _render(gemeinde):
+    return render(gemeinde, _out_dir, _png)
+
+
+def _write_plotly_js(out_dir):
+    from plotly.offline import get_plotlyjs
+
+    path = out_dir / "plotly.min.js"
+    if not path.exists():
+        path.write_text(get_plotlyjs(), encoding="utf-8")
+
+
+def prepare():
+    """Load every dataset and build what the reports read, before the workers are forked."""
+    warmup.warm_up()
+    indikatoren.get()
+    einkommen.wide(einkommen.GEMEINDEN)
+
+
+def run(names, out_dir=OUT_DIR, workers=None, png=False):
+    """Render the reports of `names` with a pool of forked workers; returns the written paths.
+
+    Call `prepare` first, or every worker loads the data itself.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _write_plotly_js(out_dir)
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        return [render(name, out_dir, png) for name in names]
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(out_dir, png)) as pool:
+        return list(pool.map(_render, names, chunksize=4))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("gemeinden", nargs="*", help="default: every Gemeinde")
+    parser.add_argument("--out", type=Path, default=OUT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--png", action="store_true", help="also write the charts as PNG (needs kaleido)")
+    args = parser.parse_args()
+
+    if args.png:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            sys.exit("--png needs the kaleido package: pip install kaleido")
+
+    names = args.gemeinden or gemeinden.table()["gemeinde_de"].tolist()
+    start = time.perf_counter()
+    prepare()
+    loaded = time.perf_counter()
+    paths = run(names, args.out, args.workers, args.png)
+    seconds = time.perf_counter() - loaded
+    print(f"data loaded in {loaded - start:.1f} s")
+    print(f"{len(paths)} reports in {seconds:.1f} s, {len(paths) / seconds:.1f} reports/s, written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Bounded in-process caches shared by all sessions."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Least-recently-used cache with a size limit, an optional TTL and hit/miss counters.
+
+    Entries older than `ttl` seconds are built again on their next access.
+    Hits and misses are also counted per `source`, so the share of requests
+    answered from the cache can be told apart by where they came from.
+    Values are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._sources = {}
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, source, hit):
+        counts = self._sources.setdefault(source, [0, 0])
+        counts[0 if hit else 1] += 1
+
+    def get_or_create(self, key, build, source=None):
+        """Return the value for `key`, calling `build()` to create it on a miss."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                value, created = item
+                if self.ttl is None or time.monotonic() - created < self.ttl:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    self._count(source, True)
+                    return value
+                del self._items[key]
+                self.expired += 1
+            self.misses += 1
+            self._count(source, False)
+        # Built outside the lock; two sessions missing the same key build it twice
+        value = build()
+        with self._lock:
+            self._items[key] = (value, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evicted += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "sources": {source: {"hits": hits, "misses": misses} for source, (hits, misses) in self._sources.items()},
+            }
@@ -0,0 +1,331 @@
+"""Plotly figures of the pages.
+
+Built figures are kept in `FIGURES`, shared by all sessions and keyed by the
+normalised selection, so a popular comparison is built once and afterwards
+only handed to `st.plotly_chart`. The cache holds figure objects rather than
+JSON: `st.plotly_chart` validates a dict spec again, which costs as much as
+building the figure. Entries expire after `CACHE_TTL` seconds
+(`STATISTIK_CACHE_TTL`), so a long-running server does not keep the
+figures of selections nobody looks at any more.
+
+plotly is imported by the builders rather than by this module, so importing
+the pages does not wait for it; `warmup` imports it in the background.
+"""
+
+import os
+
+import numpy as np
+
+from statistik import cube, data, einkommen, geometrie, indikatoren, instrument, karte, omi, uebersicht, urlstate
+from statistik.cache import LRUCache
+
+
+CACHE_TTL = float(os.environ.get("STATISTIK_CACHE_TTL", 3600))
+
+FIGURES = LRUCache(maxsize=256, ttl=CACHE_TTL)
+
+
+def cached(key, build):
+    """The figure for `key` from `FIGURES`, calling `build()` on a miss."""
+    def timed_build():
+        instrument.count("figure_cache_misses")
+        with instrument.span("figure"):
+            return build()
+
+    return FIGURES.get_or_create(key, timed_build, source=urlstate.source())
+
+
+def empty_chart(title, text):
+    """Chart without data, with `text` in place of the lines."""
+    import plotly.graph_objs as go
+
+    fig = go.Figure()
+    fig.update_layout(
+        title=title,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        annotations=[dict(text=text, showarrow=False, xref='paper', yref='paper', x=0.5, y=0.5)],
+    )
+    return fig
+
+
+def line_chart(comparison, dataset):
+    """Line chart of the selected Gemeinden and the average of all Gemeinden."""
+    import plotly.graph_objs as go
+
+    comparison_df = comparison.table
+    if comparison_df.empty:
+        # Without a year in which all selected Gemeinden have a value the y-axis bounds are NaN
+        return empty_chart(dataset.title, "Keine gemeinsamen Jahre mit Werten für diese Gemeinden")
+    mittelwert_cols = [f'Mittelwert {gemeinde}' for gemeinde in comparison.gemeinden]
+    mean_col = dataset.mean_label
+
+    # Calculate the min and max values across all 'Mittelwert' columns
+    min_mittelwert = comparison_df[mittelwert_cols + [mean_col]].min().min()
+    max_mittelwert = comparison_df[mittelwert_cols + [mean_col]].max().max()
+
+    # Define the lower and upper bounds of the y-axis ticks as multiples of the tick step
+    step = dataset.tick_step
+    lower_bound = (min_mittelwert // step) * step
+    upper_bound = ((max_mittelwert // step) + 1) * step
+
+    # Generate the y-ticks from lower_bound to upper_bound
+    y_ticks = np.arange(start=lower_bound, stop=upper_bound+1, step=step)  # +1 ensures the upper_bound is included if it's a multiple of the step
+
+    fig = go.Figure()
+    for gemeinde, mittelwert_col in zip(comparison.gemeinden, mittelwert_cols):
+        fig.add_trace(go.Scatter(
+            x=comparison_df['Jahr'],
+            y=comparison_df[mittelwert_col],
+            mode='lines',
+            name=gemeinde
+        ))
+
+    fig.add_trace(go.Scatter(
+        x=comparison_df['Jahr'],
+        y=comparison_df[mean_col],
+        mode='lines',
+        name='Durchschnitt Gemeinden'
+    ))
+
+    fig.update_layout(
+        title=dataset.title,
+        xaxis=dict(
+            title="Jahr",
+            tickmode='array',
+            tickvals=comparison_df['Jahr'],  # set the ticks to the 'Jahr' values
+            ticktext=comparison_df['Jahr']   # set the tick text to the 'Jahr' values
+        ),
+        yaxis=dict(
+            title="€ pro Quadratmeter",
+            tickmode='array',
+            tickvals=y_ticks,
+            range=[lower_bound, upper_bound]   # set the ticks to your custom y-axis values
+        ),
+        legend_title="Gemeinden",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.5,  # Adjust as needed for your layout
+            xanchor="center",
+            x=0.5
+        )
+    )
+    return fig
+
+
+def ranking_table(ranking, value_label, title, height):
+    """Table of a top or bottom ranking of `omi.ranking`, ranked by the column `value_label`."""
+    import plotly.graph_objs as go
+
+    header = value_label if value_label.endswith('(%)') else f'{value_label} (€/m2)'
+    table = go.Figure(go.Table(
+        header=dict(values=['Rang', 'Gemeinde', header], fill_color='paleturquoise', align='left'),
+        cells=dict(values=[ranking['Rang'], ranking['Gemeinde'], ranking[value_label]], fill_color='white', align='left')
+    ))
+
+    table.update_layout(
+        title=title,
+        width=800,  # Adjust width according to your needs
+        height=height   # Adjust height based on your content
+    )
+    return table
+
+
+def income_chart(table, title, legend_title):
+    """Line chart of the income series in `table` (years x series), in column order."""
+    import plotly.graph_objs as go
+
+    if table.empty:
+        return empty_chart(title, "Keine Werte für diese Auswahl")
+    # Setting up a dynamic y-axis range
+    min_mittelwert = table.min().min()
+    max_mittelwert = table.max().max()
+    lower_bound = (min_mittelwert // 1000) * 1000
+    upper_bound = ((max_mittelwert // 1000) + 1) * 1000
+    y_ticks = np.arange(start=lower_bound, stop=upper_bound + 1, step=2000)  # Including upper bound
+
+    fig = go.Figure()
+    for name in table.columns:
+        values = table[name].dropna()
+        fig.add_trace(go.Scatter(
+            x=values.index,
+            y=values,
+            mode='lines',
+            name=name
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis=dict(
+            title='Jahr',
+            tickmode='array',
+            tickvals=table.index,  # Ensuring all years are displayed
+            ticktext=[str(year) for year in table.index]
+        ),
+        yaxis=dict(
+            title='Einkommen in €',
+            tickmode='array',
+            tickvals=y_ticks,
+            range=[lower_bound, upper_bound],  # Setting the range for the y-axis
+            tickformat="."
+        ),
+        legend_title=legend_title,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.5,  # Adjust this value to position the legend below the chart
+            xanchor="center",
+            x=0.5
+        )
+    )
+    return fig
+
+
+def income_figure(level, label, chosen):
+    """Income chart of the fixed and the `chosen` series of `level`, from `FIGURES` if possible."""
+    column = einkommen.ARTEN[label]
+    names = einkommen.selection(level, chosen)
+    return cached(
+        ('einkommen', level.name, data.version(level.name), column, names),
+        lambda: income_chart(einkommen.series(level, column, names), f'Vergleich: {label}', level.legend_title),
+    )
+
+
+def indicator_chart(table, title, y_title):
+    """Line chart of one indicator for the Gemeinden in `table` (years x Gemeinden)."""
+    import plotly.graph_objs as go
+
+    fig = go.Figure()
+    for gemeinde in table.columns:
+        values = table[gemeinde].dropna()
+        fig.add_trace(go.Scatter(
+            x=values.index,
+            y=values,
+            mode='lines',
+            name=gemeinde
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis=dict(
+            title="Jahr",
+            tickmode='array',
+            tickvals=table.index,
+            ticktext=[str(year) for year in table.index]
+        ),
+        yaxis=dict(title=y_title),
+        legend_title="Gemeinden",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.5,
+            xanchor="center",
+            x=0.5
+        )
+    )
+    return fig
+
+
+def indicator_figure(label, cod_tip, fascia, stato, gemeinden):
+    """Indicator chart of the selected Gemeinden, from `FIGURES` if possible."""
+    indicator = indikatoren.INDIKATOREN[label]
+    gemeinden = omi.normalize(gemeinden)
+    versions = tuple(data.version(name) for name in ("preise_df", "mietpreise", "all_comune"))
+    return cached(
+        ('indikator', versions, indicator, cod_tip, fascia, stato, gemeinden),
+        lambda: indicator_chart(indikatoren.get().series(cod_tip, fascia, stato, indicator, gemeinden), label, label),
+    )
+
+
+def map_chart(table, kennzahl, title, level):
+    """Choropleth of the Gemeinden in `table` (see `karte.values`) on the bundled geometry of `level`.
+
+    The geometry is referenced by URL, so the figure carries only the keys and
+    the values; the browser fetches each geometry file once and caches it.
+    """
+    import plotly.graph_objs as go
+
+    fig = go.Figure(go.Choroplethmap(
+        geojson=geometrie.url(level),
+        locations=table.index.tolist(),
+        z=table['value'].tolist(),
+        text=table['gemeinde_de'].tolist(),
+        hovertemplate='%{text}: %{z}<extra></extra>',
+        colorscale=kennzahl.colorscale,
+        colorbar=dict(title=kennzahl.unit),
+        marker_line_width=0.5,
+        marker_line_color='white',
+    ))
+    fig.update_layout(
+        title=title,
+        map=dict(style='white-bg', center=dict(lat=46.65, lon=11.45), zoom=7.3),
+        margin=dict(l=0, r=0, t=50, b=0),
+        height=550,
+    )
+    return fig
+
+
+def map_figure(label, cod_tip, fascia, stato, year, level):
+    """Map of the metric `label` for one selection and year, from `FIGURES` if possible."""
+    kennzahl = karte.KENNZAHLEN[label]
+    versions = tuple(data.version(name) for name in ("preise_df", "mietpreise", "all_comune"))
+    return cached(
+        ('karte', versions, label, cod_tip, fascia, stato, year, level),
+        lambda: map_chart(karte.values(label, cod_tip, fascia, stato, year), kennzahl, f'{label} {year}', level),
+    )
+
+
+def overview(dataset, cod_tip, fascia, stato, both_semesters=False):
+    """(HTML, payload bytes) of the WebGL overview of all Gemeinden, from `FIGURES` if possible."""
+    def build():
+        data_cube = cube.get(dataset.name, both_semesters)
+        values = data_cube.slice(cod_tip, fascia, stato)[..., 1]
+        present = ~np.isnan(values).all(axis=1)
+        average = data_cube.average(cod_tip, fascia, stato).reindex(data_cube.years)
+        fig = uebersicht.chart(
+            values[present], data_cube.years, data_cube.gemeinden[present], average.to_numpy(),
+            dataset.unit, f"{dataset.value_label}: alle Gemeinden", dataset.value_format,
+        )
+        return uebersicht.html(fig)
+
+    return cached(('overview', dataset.name, data.version(dataset.name), both_semesters, cod_tip, fascia, stato), build)
+
+
+def ranking_figures(dataset, cod_tip, fascia, stato, year=None, k=5, span=None, both_semesters=False):
+    """Top and bottom `k` table of one selection, year and ranking criterion, from `FIGURES` if possible."""
+    selection = (dataset.name, data.version(dataset.name), both_semesters, cod_tip, fascia, stato, year, k, span)
+
+    def ranking():
+        return omi.ranking(dataset, cod_tip, fascia, stato, year, k, span, both_semesters)
+
+    # The tables grow with k; 350 and 400 pixels fit the five rows of the default
+    extra = 30 * max(k - 5, 0)
+    top = cached(
+        ('top', *selection),
+        lambda: ranking_table(ranking().top, ranking().value_label, f'Top {k} {ranking().year}', height=350 + extra),
+    )
+    bottom = cached(
+        ('bottom', *selection),
+        lambda: ranking_table(ranking().bottom, ranking().value_label, f'Bottom {k} {ranking().year}', height=400 + extra),
+    )
+    return top, bottom
+
+
+def line_figure(dataset, cod_tip, fascia, stato, gemeinden, both_semesters=False):
+    """Line chart of the selected Gemeinden and the average, from `FIGURES` if possible.
+
+    The Gemeinden are normalised first, so the same three Gemeinden in any
+    order share one entry, with the lines in alphabetical order.
+    """
+    gemeinden = omi.normalize(gemeinden)
+    return cached(
+        ('line', dataset.name, data.version(dataset.name), both_semesters, cod_tip, fascia, stato, gemeinden),
+        lambda: line_chart(omi.compare(dataset, cod_tip, fascia, stato, gemeinden, both_semesters=both_semesters), dataset),
+    )
+
+
+def omi_figures(dataset, cod_tip, fascia, stato, gemeinden, both_semesters=False):
+    """Line chart, top 5 and bottom 5 table of the most recent year of one selection."""
+    line = line_figure(dataset, cod_tip, fascia, stato, gemeinden, both_semesters)
+    return (line, *ranking_figures(dataset, cod_tip, fascia, stato, both_semesters=both_semesters))
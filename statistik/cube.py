@@ -0,0 +1,251 @@
+"""Dense, pre-indexed arrays of the OMI price and rent tables.
+
+The OMI frames are turned once into a NumPy array with the axes
+(Cod_Tip, Fascia, Stato, gemeinde, Anno, value column). A selector
+combination is then a plain index into that array instead of a boolean scan
+over every row, and a single Gemeinde is one more index. The average over all
+Gemeinden and the rankings by middle value are computed for every combination
+and year when the cube is built; rankings by growth over a number of years
+are computed for all of them at once on first use.
+"""
+
+import numpy as np
+import pandas as pd
+
+from statistik import data, gemeinden, schema
+
+
+KEYS = ("Cod_Tip", "Fascia", "Stato", "gemeinde_id", "Anno")
+
+# Minimum, middle and maximum value column of each OMI dataset
+VALUE_COLUMNS = {
+    "preise_df": ("Compr_min", "Compr_medio", "Compr_max"),
+    "mietpreise": ("Loc_min", "Average_Loc", "Loc_max"),
+}
+
+
+class Cube:
+    """OMI values indexed by (Cod_Tip, Fascia, Stato, gemeinde, Anno).
+
+    The Gemeinde axis holds the integer keys of `statistik.gemeinden`, with the
+    names in `axes["gemeinde_de"]`. Cells without a quotation are NaN. If the
+    source has several rows for the same key (several microzones of a Gemeinde
+    in one Fascia), the cell holds their mean.
+    """
+
+    def __init__(self, axes, columns, values, aggregates=None):
+        self.axes = axes
+        self.columns = tuple(columns)
+        self.values = values
+        self._positions = {key: {label: i for i, label in enumerate(labels)} for key, labels in axes.items()}
+        self.counts, self.averages, self.top_order, self.bottom_order = aggregates or _aggregate(values)
+        self._growth_rankings = {}
+        # Shared by all sessions: slices are views, so writing through one must fail
+        for array in (*self.axes.values(), self.values, self.counts, self.averages, self.top_order, self.bottom_order):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_frame(cls, df, columns):
+        # Rows without a Gemeinde key have been reported when the data was loaded
+        df = df[df["gemeinde_id"] != gemeinden.NO_KEY]
+        axes = {}
+        codes = []
+        for key in KEYS:
+            key_codes, labels = pd.factorize(df[key], sort=True)
+            axes[key] = np.asarray(labels)
+            codes.append(key_codes)
+        axes["gemeinde_de"] = gemeinden.names(axes["gemeinde_id"])
+        shape = tuple(len(axes[key]) for key in KEYS)
+        return cls(axes, columns, _cells(df, tuple(codes), shape, columns))
+
+    def with_period(self, label, df):
+        """Copy of the cube with the year `label` set to the rows of `df`.
+
+        Only the cells and aggregates of that year are computed; those of the
+        other years are reused. Returns None if `df` has a Cod_Tip, Fascia,
+        Stato or Gemeinde key the cube does not know; the cube then has to be
+        built again from the whole frame.
+        """
+        df = df[df["gemeinde_id"] != gemeinden.NO_KEY]
+        codes = []
+        for key in KEYS[:-1]:
+            key_codes = pd.Index(self.axes[key]).get_indexer(df[key])
+            if (key_codes < 0).any():
+                return None
+            codes.append(key_codes)
+        codes.append(np.zeros(len(df), dtype=np.intp))
+        cells = _cells(df, tuple(codes), self.values.shape[:4] + (1,), self.columns)
+        aggregates = _aggregate(cells)
+        current = (self.counts, self.averages, self.top_order, self.bottom_order)
+
+        years = self.years
+        year_pos = self._positions["Anno"].get(label)
+        if year_pos is None:
+            year_pos = int(np.searchsorted(years, label))
+            years = np.insert(years, year_pos, label)
+            values = np.insert(self.values, year_pos, cells[:, :, :, :, 0], axis=4)
+            aggregates = tuple(np.insert(old, year_pos, new[:, :, :, 0], axis=3) for old, new in zip(current, aggregates))
+        else:
+            values = self.values.copy()
+            values[:, :, :, :, year_pos] = cells[:, :, :, :, 0]
+            merged = []
+            for old, new in zip(current, aggregates):
+                old = old.copy()
+                old[:, :, :, year_pos] = new[:, :, :, 0]
+                merged.append(old)
+            aggregates = tuple(merged)
+        return Cube({**self.axes, "Anno": years}, self.columns, values, aggregates)
+
+    @property
+    def gemeinden(self):
+        return self.axes["gemeinde_de"]
+
+    @property
+    def years(self):
+        return self.axes["Anno"]
+
+    def position(self, key, label):
+        try:
+            return self._positions[key][label]
+        except KeyError:
+            raise KeyError(f"{label!r} is not a value of {key}") from None
+
+    def _selection(self, cod_tip, fascia, stato):
+        return (
+            self.position("Cod_Tip", cod_tip),
+            self.position("Fascia", fascia),
+            self.position("Stato", stato),
+        )
+
+    def slice(self, cod_tip, fascia, stato):
+        """Values of one selector combination as a (gemeinde, Anno, column) view."""
+        return self.values[self._selection(cod_tip, fascia, stato)]
+
+    def average(self, cod_tip, fascia, stato):
+        """Average middle value of all Gemeinden per year, as a series indexed by `Anno`."""
+        selection = self._selection(cod_tip, fascia, stato)
+        present = self.counts[selection] > 0
+        return pd.Series(self.averages[selection][present], index=pd.Index(self.years[present], name="Anno"))
+
+    def growth(self, span):
+        """Average annual growth of the middle value over `span` years in percent, per cell.
+
+        `span=1` is the change from the previous year. Cells whose year or the
+        year `span` years earlier has no value are NaN. Only for yearly cubes.
+        """
+        years = self.years
+        if not np.issubdtype(years.dtype, np.integer):
+            raise ValueError("growth rates need a cube of whole years")
+        if span < 1:
+            raise ValueError(f"growth rates need a span of at least one year, got {span}")
+        middle = self.values[..., 1]
+        earlier = np.searchsorted(years, years - span)
+        found = (earlier < len(years)) & (years[np.minimum(earlier, len(years) - 1)] == years - span)
+        base = np.where(found, middle[..., np.minimum(earlier, len(years) - 1)], np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (((middle / base) ** (1 / span) - 1) * 100).round(2)
+
+    def _rankings(self, span):
+        # (values, counts, top order, bottom order) of the middle value, or of the growth over `span` years
+        if span is None:
+            return self.values[..., 1], self.counts, self.top_order, self.bottom_order
+        rankings = self._growth_rankings.get(span)
+        if rankings is None:
+            values = self.growth(span)
+            rankings = (values, *_orders(values))
+            for array in rankings:
+                array.setflags(write=False)
+            # Two sessions asking at once both compute it; the arrays are equal
+            self._growth_rankings[span] = rankings
+        return rankings
+
+    def years_with_values(self, cod_tip, fascia, stato, span=None):
+        """Years with at least one value (or growth rate over `span` years) for the selector combination."""
+        counts = self._rankings(span)[1][self._selection(cod_tip, fascia, stato)]
+        # tolist() gives plain ints (or half-year labels) instead of NumPy scalars
+        return self.years[counts > 0].tolist()
+
+    def latest_year(self, cod_tip, fascia, stato, span=None):
+        """Most recent year with at least one value (or growth rate) for the selector combination."""
+        years = self.years_with_values(cod_tip, fascia, stato, span)
+        return years[-1] if years else None
+
+    def ranking(self, cod_tip, fascia, stato, year, k, highest=True, span=None):
+        """The `k` Gemeinden with the highest (or lowest) middle value in `year`.
+
+        With `span`, the Gemeinden are ranked by the average annual growth of
+        the middle value over the `span` years up to `year` instead. Returns a
+        series of middle values (or growth rates) indexed by Gemeinde, in rank
+        order.
+        """
+        values, counts, top_order, bottom_order = self._rankings(span)
+        selection = self._selection(cod_tip, fascia, stato)
+        year_pos = self.position("Anno", year)
+        order = (top_order if highest else bottom_order)[selection][year_pos]
+        order = order[:min(k, counts[selection][year_pos])]
+        return pd.Series(values[selection][order, year_pos], index=pd.Index(self.gemeinden[order], name="gemeinde_de"))
+
+    def members(self, cod_tip, fascia, stato):
+        """Gemeinden that have at least one value for the selector combination."""
+        present = ~np.isnan(self.slice(cod_tip, fascia, stato)).all(axis=(1, 2))
+        return self.gemeinden[present].tolist()
+
+    def frame(self, cod_tip, fascia, stato):
+        """Long frame of one selector combination, like filtering the source rows."""
+        values = self.slice(cod_tip, fascia, stato)
+        gemeinde_idx, year_idx = np.nonzero(~np.isnan(values).all(axis=2))
+        frame = pd.DataFrame(values[gemeinde_idx, year_idx], columns=self.columns)
+        frame.insert(0, "Anno", self.years[year_idx])
+        frame.insert(0, "gemeinde_de", self.gemeinden[gemeinde_idx])
+        return frame
+
+
+def _cells(df, index, shape, columns):
+    # Mean of the rows falling into each cell, NaN for cells without rows
+    sums = np.zeros(shape + (len(columns),))
+    counts = np.zeros(shape)
+    np.add.at(sums, index, df[list(columns)].to_numpy(dtype=float))
+    np.add.at(counts, index, 1)
+    with np.errstate(invalid="ignore"):
+        values = sums / counts[..., None]
+    if schema.is_float32(df, columns):
+        # OMI values have at most two decimals; drop the float32 representation noise
+        values = values.round(2)
+    return values
+
+
+def _aggregate(values):
+    # Everything below depends only on the selector combination and the year,
+    # so it is computed for all of them at once when the cube is built
+    middle = values[..., 1]
+    present = ~np.isnan(middle)
+
+    # (Cod_Tip, Fascia, Stato, Anno): number of Gemeinden and their average
+    counts, top_order, bottom_order = _orders(middle)
+    with np.errstate(invalid="ignore"):
+        averages = (np.where(present, middle, 0).sum(axis=3) / counts).round(0)
+    return counts, averages, top_order, bottom_order
+
+
+def _orders(values):
+    # (Cod_Tip, Fascia, Stato, Anno): number of Gemeinden with a value, and
+    # (Cod_Tip, Fascia, Stato, Anno, gemeinde): Gemeinde positions from the
+    # highest and from the lowest value, Gemeinden without a value last
+    counts = (~np.isnan(values)).sum(axis=3)
+    by_year = np.moveaxis(values, 3, 4)
+    top_order = np.argsort(-by_year, axis=-1, kind="stable")
+    bottom_order = np.argsort(by_year, axis=-1, kind="stable")
+    return counts, top_order, bottom_order
+
+
+def get(name, both_semesters=False):
+    """The cube of the OMI dataset `name`, built once per process.
+
+    With `both_semesters` the time axis holds half-year labels such as
+    "2023/1" instead of the years of `data.SEMESTER`.
+    """
+    if both_semesters:
+        from statistik import store
+
+        return data.derived(name, "cube_periods", lambda df: Cube.from_frame(store.periods(name, df), VALUE_COLUMNS[name]))
+    return data.derived(name, "cube", lambda df: Cube.from_frame(df, VALUE_COLUMNS[name]))
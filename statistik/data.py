@@ -0,0 +1,205 @@
+"""Process-wide access to the bundled datasets.
+
+Streamlit re-executes a page script on every widget change, so anything the
+pages read at top level would otherwise be downloaded and parsed again on each
+rerun. The frames are loaded once per server process and handed out from
+memory afterwards; `invalidate` drops them so the next access reads again.
+
+All sessions share that one copy. Callers get a shallow view of it, and with
+copy-on-write a session that modifies its view gets private copies of the
+touched columns instead of changing the shared data.
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from statistik import instrument, schema
+
+
+logger = logging.getLogger(__name__)
+
+# Always on from pandas 3; needed for the shared frames to be safe on pandas 2
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+REMOTE_URL = os.environ.get(
+    "STATISTIK_REMOTE_URL", "https://raw.githubusercontent.com/Schesch/suedtirol_statistiken/main/data/{name}.xlsx"
+)
+
+DATASETS = ("preise_df", "mietpreise", "all_comune", "all_region")
+
+# The OMI pages show the quotations of the second half of every year
+SEMESTER = 2
+
+# Keep double precision for the value columns instead of float32
+FLOAT64 = os.environ.get("STATISTIK_FLOAT64", "") not in ("", "0")
+
+
+def _clean_region(df):
+    df['Regione'] = df['Regione'].str.replace('Trentino Alto Adige(P.A.Trento)', 'Trentino', regex=False)
+    df['Regione'] = df['Regione'].str.replace('Average Region', 'Durchschnitt der Regionen', regex=False)
+    return df
+
+
+def _clean_comune(df):
+    df['Comune_DE'] = df['Comune_DE'].str.replace('Average Comune', 'Durchschnitt der Gemeinden', regex=False)
+    return df
+
+
+# Cleanup applied once after parsing, so the pages never have to modify a shared frame
+_CLEANUP = {
+    "all_region": _clean_region,
+    "all_comune": _clean_comune,
+}
+
+_frames = {}
+_derived = {}
+_versions = {}
+_registry_lock = threading.Lock()
+_locks = {}
+
+
+def source(name):
+    """Return the bundled file for `name`, or the GitHub URL if it is not bundled."""
+    path = DATA_DIR / f"{name}.xlsx"
+    if path.exists():
+        return path
+    return REMOTE_URL.format(name=name)
+
+
+def prepare(name, df):
+    """Cleanup, Gemeinde keys and dtypes applied to a freshly parsed frame."""
+    from statistik import gemeinden
+
+    cleanup = _CLEANUP.get(name)
+    if cleanup is not None:
+        df = cleanup(df)
+    df = gemeinden.assign_keys(name, df)
+    return schema.compact(df, name, float64=FLOAT64)
+
+
+def snapshot_version():
+    """Identifies the cleanup and dtypes a stored snapshot was made with."""
+    return f"{schema.VERSION}-{'f64' if FLOAT64 else 'f32'}"
+
+
+def _read(name):
+    from statistik import refresh, snapshot, store
+
+    # A store without partitions of SEMESTER cannot serve the default view
+    if store.serves(name):
+        with instrument.span("read_store"):
+            return store.read(name, semesters=(SEMESTER,)).drop(columns="semester")
+
+    src = source(name)
+    if not isinstance(src, Path):
+        logger.info("downloading %s from %s", name, src)
+        # Through `refresh`, which keeps the validators for its conditional requests
+        return refresh.download(name)
+
+    with instrument.span("read_snapshot"):
+        df = snapshot.read(name, src, version=snapshot_version())
+    if df is None:
+        logger.info("parsing %s", src)
+        with instrument.span("read_excel"):
+            df = prepare(name, pd.read_excel(src))
+        try:
+            snapshot.write(name, df, src, version=snapshot_version())
+        except OSError as exc:
+            logger.warning("could not write snapshot for %s: %s", name, exc)
+    return df
+
+
+def _lock_for(key):
+    with _registry_lock:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def load(name):
+    """Return the parsed frame for `name`, reading it on first access only.
+
+    The result is a shallow view of the frame shared by all sessions: it costs
+    no memory, and changes to it stay with the caller.
+    """
+    if name not in DATASETS:
+        raise KeyError(f"unknown dataset {name!r}")
+    df = _frames.get(name)
+    if df is None:
+        # One lock per dataset: concurrent first sessions wait for a single read
+        with _lock_for(name):
+            while (df := _frames.get(name)) is None:
+                current = version(name)
+                df = _read(name)
+                # A frame swapped in by `replace` during the read wins; after
+                # `invalidate` the source has changed and is read again
+                with _registry_lock:
+                    if version(name) == current:
+                        _frames[name] = df
+    return df.copy(deep=False)
+
+
+def derived(name, kind, build):
+    """Return `build(load(name))`, computed once per process and dataset version.
+
+    Used for indexes and aggregates that depend only on one dataset; they are
+    dropped together with the frame by `invalidate` and `replace`. A value
+    whose frame was replaced while it was being built is built again.
+    """
+    key = (name, kind)
+    value = _derived.get(key)
+    if value is not None:
+        return value
+    with _lock_for(key):
+        while (value := _derived.get(key)) is None:
+            current = version(name)
+            df = load(name)
+            with instrument.span(f"build_{kind}"):
+                value = build(df)
+            with _registry_lock:
+                if version(name) == current:
+                    _derived[key] = value
+                    return value
+    return value
+
+
+def loaded(name, kind=None):
+    """The frame (or derived value `kind`) of `name` if this process holds it, else None."""
+    if kind is None:
+        return _frames.get(name)
+    return _derived.get((name, kind))
+
+
+def replace(name, df, derived=None):
+    """Swap in a new frame for `name`, together with values derived from it.
+
+    `derived` maps a kind of `derived` to its value for `df`; every other
+    derived value of `name` is dropped and rebuilt on its next access.
+    """
+    with _registry_lock:
+        _frames[name] = df
+        _versions[name] = _versions.get(name, 0) + 1
+        for key in [key for key in _derived if key[0] == name]:
+            del _derived[key]
+        for kind, value in (derived or {}).items():
+            _derived[name, kind] = value
+
+
+def version(name):
+    """Counter that changes whenever `name` is invalidated, for use in cache keys."""
+    return _versions.get(name, 0)
+
+
+def invalidate(name=None):
+    """Forget the cached frame for `name`, or for every dataset if `name` is None."""
+    with _registry_lock:
+        names = DATASETS if name is None else (name,)
+        for name in names:
+            _frames.pop(name, None)
+            _versions[name] = _versions.get(name, 0) + 1
+        for key in [key for key in _derived if key[0] in names]:
+            del _derived[key]
@@ -0,0 +1,79 @@
+"""Income series of the regions and Gemeinden, for the income page.
+
+Each income dataset is grouped once per process into a wide table with one
+row per year and one column per (income type, region or Gemeinde). Any set of
+series, up to all 116 Gemeinden at once, is then a column selection of that
+table instead of a scan of the rows per series.
+"""
+
+from dataclasses import dataclass
+
+from statistik import data, instrument
+
+
+# Selectbox labels of the page and the income column they stand for
+ARTEN = {
+    "Einkommen aus abhängiger Beschäftigung": "medio_dipendente",
+    "Einkommen aus autonomer Arbeit": "medio_autonomo",
+    "Unternehmer mit regulärer Buchführung": "medio_impr_normale",
+    "Unternehmer mit vereinfachter Buchführung": "medio_impr_semplice",
+    "Einkommen aus Pensionen": "medio_pensione",
+    "Einkommen aus Gebäuden": "medio_fabbricati",
+    "Gesamtes steuerpflichtiges Einkommen": "medio_totale",
+}
+
+
+@dataclass(frozen=True)
+class Level:
+    """Regions or Gemeinden: the dataset and what the page shows of it."""
+
+    name: str               # dataset
+    entity: str             # column with the name of the region or Gemeinde
+    fixed: tuple            # series always shown, before the selected ones
+    legend_title: str
+
+
+REGIONEN = Level(
+    name="all_region",
+    entity="Regione",
+    fixed=("Südtirol", "Durchschnitt der Regionen"),
+    legend_title="Regionen",
+)
+
+GEMEINDEN = Level(
+    name="all_comune",
+    entity="Comune_DE",
+    fixed=("Durchschnitt der Gemeinden",),
+    legend_title="Gemeinden",
+)
+
+
+def _wide(df, level):
+    return df.groupby(["Anno", level.entity], observed=True)[list(ARTEN.values())].mean().unstack(level.entity)
+
+
+def wide(level):
+    """Years x (income column, entity) table of `level`, built once per process."""
+    return data.derived(level.name, "wide", lambda df: _wide(df, level))
+
+
+def entities(level):
+    """Regions or Gemeinden to choose from, sorted, without the fixed series."""
+    return data.derived(
+        level.name, "entities",
+        lambda df: sorted(set(df[level.entity].astype(str)) - set(level.fixed)),
+    )
+
+
+def selection(level, chosen):
+    """The fixed series and the chosen ones in a fixed order, for the figure and its cache key."""
+    chosen = sorted(set(chosen) - set(level.fixed))
+    return (*level.fixed, *chosen)
+
+
+def series(level, column, names):
+    """Years x `names` table of the income `column`; years no series has are dropped."""
+    with instrument.span("filter"):
+        table = wide(level)[column].reindex(columns=list(names)).dropna(how="all")
+    instrument.count("rows", int(table.count().sum()))
+    return table
@@ -0,0 +1,136 @@
+"""Municipality dimension shared by all datasets.
+
+`data/gemeinden.csv` lists every Gemeinde of Südtirol once, with its ISTAT
+code, its Italian and German name and a small integer `key`. The keys were
+assigned in alphabetical order of the German names, so sorting by key sorts
+by name. `data/gemeinden_aliases.csv` adds other spellings and the names of
+fractions that some sources use instead of the Gemeinde (Kardaun for
+Karneid, Seis for Kastelruth).
+
+Every loader maps its name column to `gemeinde_id` with `assign_keys`, which
+also replaces the name by the German name of the dimension. Joins, filters
+and groupbys across datasets then run on the integer key. Names that match
+neither a Gemeinde nor an alias get the key -1 and are reported.
+
+    python -m statistik.gemeinden    # how the names of every dataset were matched
+"""
+
+import logging
+import re
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from statistik import data
+
+
+logger = logging.getLogger(__name__)
+
+TABLE_PATH = data.DATA_DIR / "gemeinden.csv"
+ALIASES_PATH = data.DATA_DIR / "gemeinden_aliases.csv"
+
+# Name column of each dataset with one row per Gemeinde
+NAME_COLUMNS = {
+    "preise_df": "gemeinde_de",
+    "mietpreise": "gemeinde_de",
+    "all_comune": "Comune_DE",
+}
+
+# Rows that stand for no single Gemeinde and are expected not to match
+AGGREGATES = {"Durchschnitt der Gemeinden"}
+
+NO_KEY = -1
+
+
+def _normalize(name):
+    name = str(name).casefold().replace("ß", "ss")
+    return re.sub(r"\s*-\s*", "-", re.sub(r"\s+", " ", name)).strip()
+
+
+@lru_cache(maxsize=1)
+def table():
+    """The dimension table, indexed by `key`."""
+    return pd.read_csv(TABLE_PATH, dtype={"istat": str}).set_index("key").sort_index()
+
+
+@lru_cache(maxsize=1)
+def _lookup():
+    dimension = table()
+    by_istat = dict(zip(dimension["istat"], dimension.index))
+    lookup = {}
+    for key, row in dimension.iterrows():
+        lookup[_normalize(row["gemeinde_de"])] = key
+        lookup[_normalize(row["name_it"])] = key
+    aliases = pd.read_csv(ALIASES_PATH, dtype=str)
+    for alias, istat in zip(aliases["alias"], aliases["istat"]):
+        lookup[_normalize(alias)] = by_istat[istat]
+    return lookup
+
+
+def by_istat():
+    """ISTAT code (as int) -> key."""
+    dimension = table()
+    return dict(zip(dimension["istat"].astype(int), dimension.index))
+
+
+def keys(labels):
+    """Keys of the names `labels`, -1 where a name matches no Gemeinde, as an int16 array."""
+    lookup = _lookup()
+    labels = pd.Series(labels)
+    # Map the distinct names only; the datasets repeat each name many times
+    distinct = labels.unique()
+    mapped = dict(zip(distinct, [lookup.get(_normalize(label), NO_KEY) for label in distinct]))
+    return labels.map(mapped).to_numpy(dtype=np.int16)
+
+
+def names(ids):
+    """German names of the keys `ids`."""
+    return table()["gemeinde_de"].reindex(ids).to_numpy()
+
+
+def assign_keys(name, df):
+    """Add `gemeinde_id` to the frame of dataset `name` and use the names of the dimension.
+
+    Rows of an alias that duplicate a row of its Gemeinde exactly (Seis and
+    Kastelruth, for instance) are dropped. Identical rows under the name of
+    the Gemeinde itself are kept.
+    """
+    column = NAME_COLUMNS.get(name)
+    if column is None:
+        return df
+    original = df[column].astype(str)
+    ids = keys(original)
+    missing = sorted(set(original[ids == NO_KEY]) - AGGREGATES)
+    if missing:
+        logger.warning("%s: no Gemeinde for %s", name, ", ".join(missing))
+
+    canonical = np.where(ids != NO_KEY, names(ids), original)
+    df = df.assign(**{column: canonical, "gemeinde_id": ids})
+    alias = original.to_numpy() != canonical
+    if alias.any():
+        rows = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        duplicated = alias & np.isin(rows, rows[~alias])
+        if duplicated.any():
+            logger.info("%s: dropped %d rows duplicated by an alias", name, int(duplicated.sum()))
+            df = df[~duplicated].reset_index(drop=True)
+    return df
+
+
+def main(datasets):
+    for name in datasets or NAME_COLUMNS:
+        column = NAME_COLUMNS[name]
+        df = data.load(name)
+        ids = df["gemeinde_id"]
+        missing = sorted(set(df.loc[ids == NO_KEY, column].astype(str)) - AGGREGATES)
+        print(f"{name:<12} {ids[ids != NO_KEY].nunique():>4} of {len(table())} Gemeinden, "
+              f"unmatched: {', '.join(missing) or '-'}")
+        absent = sorted(set(table()["gemeinde_de"]) - set(df[column].astype(str)))
+        if absent:
+            print(f"{'':<12} no rows for {', '.join(absent)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main(sys.argv[1:])
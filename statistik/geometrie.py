@@ -0,0 +1,220 @@
+"""Bundled, pre-simplified boundaries of the Gemeinden for the map page.
+
+The boundaries come from the Openpolis municipality limits (CC BY 4.0), as a
+GeoJSON file (`limits_P_21_municipalities.geojson`) or as the GeoArrow/WKB
+feather file of the `italy-geopop` package. `build` simplifies them once, at
+every tolerance of `LEVELS`, and writes one GeoJSON file per level to
+`static/`. Each feature has the Gemeinde key of `statistik.gemeinden` as id.
+
+Streamlit serves `static/` itself (`enableStaticServing`), so the map refers
+to the geometry by URL: the browser downloads a file once and keeps it in its
+cache, and a figure sent on a rerun carries only the keys and the values.
+
+The simplification is Douglas-Peucker, run separately on every stretch of
+boundary between two points where the set of Gemeinden sharing the boundary
+changes. Both neighbours therefore get the same simplified line, and no gaps
+or overlaps open up between them.
+
+    python -m statistik.geometrie limits_P_21_municipalities.geojson
+"""
+
+import json
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from statistik import gemeinden
+
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+# Tolerance in degrees (0.001 degrees are about 80 m east-west and 110 m north-south here)
+LEVELS = {
+    "grob": 0.004,
+    "mittel": 0.001,
+    "fein": 0.0002,
+}
+
+DECIMALS = 5
+
+
+def path_for(level):
+    return STATIC_DIR / f"gemeinden_{level}.geojson"
+
+
+def url(level):
+    """URL of the geometry of `level`, relative to the page."""
+    return f"app/static/gemeinden_{level}.geojson"
+
+
+def _parse_wkb(buffer, offset=0):
+    # Returns ([polygon, ...], offset), a polygon being a list of (n, 2) rings
+    byteorder = "<" if buffer[offset] == 1 else ">"
+    (kind,) = struct.unpack_from(byteorder + "I", buffer, offset + 1)
+    offset += 5
+    kind %= 1000
+    if kind == 3:
+        (rings,) = struct.unpack_from(byteorder + "I", buffer, offset)
+        offset += 4
+        polygon = []
+        for _ in range(rings):
+            (points,) = struct.unpack_from(byteorder + "I", buffer, offset)
+            offset += 4
+            ring = np.frombuffer(buffer, dtype=byteorder + "f8", count=points * 2, offset=offset)
+            polygon.append(ring.reshape(-1, 2).copy())
+            offset += points * 16
+        return [polygon], offset
+    if kind == 6:
+        (parts,) = struct.unpack_from(byteorder + "I", buffer, offset)
+        offset += 4
+        polygons = []
+        for _ in range(parts):
+            part, offset = _parse_wkb(buffer, offset)
+            polygons.extend(part)
+        return polygons, offset
+    raise ValueError(f"unsupported WKB geometry type {kind}")
+
+
+def _from_geojson(geometry):
+    coordinates = geometry["coordinates"]
+    if geometry["type"] == "Polygon":
+        coordinates = [coordinates]
+    return [[np.asarray(ring, dtype=float)[:, :2] for ring in polygon] for polygon in coordinates]
+
+
+def read_source(path):
+    """{ISTAT code: [polygon, ...]} of the Gemeinden in `data/gemeinden.csv`."""
+    path = Path(path)
+    wanted = gemeinden.by_istat()
+    shapes = {}
+    if path.suffix in (".feather", ".arrow", ".parquet"):
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path).to_pydict()
+        for code, geometry in zip(table["municipality_code"], table["geometry"]):
+            if int(code) in wanted:
+                shapes[int(code)] = _parse_wkb(geometry)[0]
+    else:
+        for feature in json.loads(path.read_text(encoding="utf-8"))["features"]:
+            properties = feature["properties"]
+            code = int(properties.get("com_istat_code_num") or properties["com_istat_code"])
+            if code in wanted:
+                shapes[code] = _from_geojson(feature["geometry"])
+    missing = sorted(set(wanted) - set(shapes))
+    if missing:
+        raise ValueError(f"{path}: no boundary for ISTAT codes {missing}")
+    return shapes
+
+
+def _douglas_peucker(points, tolerance):
+    """Mask of the points of the open line `points` kept at `tolerance`."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        direction = end - start
+        length = np.hypot(*direction)
+        if length == 0:
+            distances = np.hypot(*(inner - start).T)
+        else:
+            distances = np.abs(direction[0] * (inner[:, 1] - start[1]) - direction[1] * (inner[:, 0] - start[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def _owners(shapes):
+    # Rounded coordinate -> Gemeinden whose boundary passes through it
+    owners = {}
+    for code, polygons in shapes.items():
+        for polygon in polygons:
+            for ring in polygon:
+                for point in map(tuple, ring.round(7)):
+                    owners.setdefault(point, set()).add(code)
+    return owners
+
+
+def _simplify_ring(ring, tolerance, owners):
+    points = ring[:-1] if np.array_equal(ring[0], ring[-1]) else ring
+    n = len(points)
+    if n < 4:
+        return ring
+    shared = [frozenset(owners[point]) for point in map(tuple, points.round(7))]
+    fixed = [i for i in range(n) if shared[i] != shared[i - 1] or shared[i] != shared[(i + 1) % n]]
+    if not fixed:
+        # A boundary nobody else shares: anchor it at two opposite points
+        fixed = [0, int(np.argmax(np.hypot(*(points - points[0]).T)))]
+
+    keep = np.zeros(n, dtype=bool)
+    keep[fixed] = True
+    for first, last in zip(fixed, fixed[1:] + [fixed[0] + n]):
+        indices = np.arange(first, last + 1) % n
+        keep[indices[_douglas_peucker(points[indices], tolerance)]] = True
+    simplified = points[keep]
+    if len(simplified) < 3:
+        return ring
+    return np.vstack([simplified, simplified[:1]])
+
+
+def simplify(shapes, tolerance):
+    """`shapes` with every ring simplified at `tolerance` degrees."""
+    owners = _owners(shapes)
+    return {
+        code: [[_simplify_ring(ring, tolerance, owners) for ring in polygon] for polygon in polygons]
+        for code, polygons in shapes.items()
+    }
+
+
+def feature_collection(shapes):
+    """GeoJSON of `shapes` with the Gemeinde key as feature id."""
+    keys = gemeinden.by_istat()
+    names = dict(zip(gemeinden.table().index, gemeinden.table()["gemeinde_de"]))
+    features = []
+    for code, polygons in sorted(shapes.items()):
+        key = int(keys[code])
+        features.append({
+            "type": "Feature",
+            "id": key,
+            "properties": {"name": names[key], "istat": f"{code:06d}"},
+            "geometry": {
+                "type": "MultiPolygon",
+                "coordinates": [[ring.round(DECIMALS).tolist() for ring in polygon] for polygon in polygons],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def build(source):
+    """Write the GeoJSON of every level of `LEVELS`; returns {level: (points, bytes)}."""
+    shapes = read_source(source)
+    STATIC_DIR.mkdir(exist_ok=True)
+    sizes = {"original": (sum(len(ring) for polygons in shapes.values() for polygon in polygons for ring in polygon), None)}
+    for level, tolerance in LEVELS.items():
+        simplified = simplify(shapes, tolerance)
+        text = json.dumps(feature_collection(simplified), separators=(",", ":"), ensure_ascii=False)
+        path_for(level).write_text(text, encoding="utf-8")
+        points = sum(len(ring) for polygons in simplified.values() for polygon in polygons for ring in polygon)
+        sizes[level] = (points, len(text.encode()))
+    return sizes
+
+
+def main(argv):
+    if len(argv) != 1:
+        sys.exit(__doc__.strip().splitlines()[-1].strip())
+    for level, (points, size) in build(argv[0]).items():
+        print(f"{level:<9} {points:>7} points" + (f" {size / 1024:>8.0f} KB" if size else ""))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,153 @@
+"""Import of the raw OMI quotation exports into the partitioned store.
+
+The Agenzia delle Entrate publishes the OMI quotations of a half-year as a
+semicolon-separated file with one row per zone, property type and condition
+for every Italian comune (`QI_<id>_1_<Anno><semester>_VALORI.csv`). Sale
+prices and rents are in the same row, with decimal commas.
+
+The file is streamed in chunks of `CHUNKSIZE` rows: every chunk is reduced to
+the comuni of `data/gemeinden.csv` and summed per (Gemeinde, Fascia, Cod_Tip,
+Stato) right away, so memory depends on the number of these keys and not on
+the size of the file. The zones of a Gemeinde in one Fascia are averaged,
+like in the bundled xlsx files, and the result is written as one partition
+of `preise_df` and one of `mietpreise`. The national export is streamed the
+same way; its comuni outside the Gemeinde dimension are skipped, as the pages
+have no key, boundary or name for them.
+
+    python -m statistik.importer QI_1234_1_20241_VALORI.csv [more files]
+"""
+
+import argparse
+import logging
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from statistik import gemeinden, store
+
+
+logger = logging.getLogger(__name__)
+
+CHUNKSIZE = 100_000
+
+KEYS = ["gemeinde_de", "Fascia", "Cod_Tip", "Stato"]
+
+# Dataset: the export's minimum and maximum column, the columns they become
+# in the dataset, and the decimals of the values
+TARGETS = {
+    "preise_df": (("Compr_min", "Compr_max"), ("Compr_min", "Compr_medio", "Compr_max"), 0),
+    "mietpreise": (("Loc_min", "Loc_max"), ("Loc_min", "Average_Loc", "Loc_max"), 1),
+}
+
+_USECOLS = ["Comune_ISTAT", "Fascia", "Cod_Tip", "Stato",
+            "Compr_min", "Compr_max", "Loc_min", "Loc_max"]
+_PERIOD = re.compile(r"(\d{4})([12])_VALORI", re.IGNORECASE)
+
+
+def period_of(path):
+    """(Anno, semester) from the name of an export file, or None."""
+    match = _PERIOD.search(Path(path).name)
+    return (int(match[1]), int(match[2])) if match else None
+
+
+def _header_line(path):
+    # The exports start with a title line before the column names
+    with open(path, encoding="latin-1") as fh:
+        for number, line in enumerate(fh):
+            if "Comune_ISTAT" in line:
+                return number
+            if number > 20:
+                break
+    raise ValueError(f"{path}: no OMI header line found")
+
+
+def _chunks(path, chunksize):
+    return pd.read_csv(
+        path,
+        sep=";",
+        decimal=",",
+        encoding="latin-1",
+        skiprows=_header_line(path),
+        usecols=_USECOLS,
+        dtype={"Comune_ISTAT": str, "Fascia": str, "Stato": str},
+        chunksize=chunksize,
+    )
+
+
+def _partial_sums(chunk, names):
+    """Per key and dataset: sums of minimum, middle and maximum value, and the number of zones."""
+    istat = pd.to_numeric(chunk["Comune_ISTAT"], errors="coerce")
+    chunk = chunk.assign(gemeinde_de=istat.map(names)).dropna(subset=["gemeinde_de"])
+    chunk = chunk.assign(Stato=chunk["Stato"].str.strip().str.upper(), Fascia=chunk["Fascia"].str.strip())
+
+    sums = {}
+    for name, ((low, high), columns, _) in TARGETS.items():
+        rows = chunk.dropna(subset=[low, high])
+        values = pd.DataFrame({
+            columns[0]: rows[low],
+            columns[1]: (rows[low] + rows[high]) / 2,
+            columns[2]: rows[high],
+            "zones": 1,
+        })
+        values[KEYS] = rows[KEYS]
+        sums[name] = values.groupby(KEYS, sort=False).sum()
+    return sums, len(chunk)
+
+
+def read_export(path, chunksize=CHUNKSIZE):
+    """Stream one export file; returns {dataset: frame} and the number of rows read."""
+    table = gemeinden.table()
+    names = dict(zip(table["istat"].astype(int), table["gemeinde_de"]))
+    totals = {name: None for name in TARGETS}
+    rows_read = kept = 0
+    for chunk in _chunks(path, chunksize):
+        rows_read += len(chunk)
+        sums, n = _partial_sums(chunk, names)
+        kept += n
+        for name, part in sums.items():
+            # Folded in after every chunk, so at most one row per key is held
+            total = totals[name]
+            totals[name] = part if total is None else pd.concat([total, part]).groupby(level=KEYS, sort=False).sum()
+    logger.info("%s: %d rows, %d of them for the selected Gemeinden", path, rows_read, kept)
+
+    frames = {}
+    for name, (_, columns, decimals) in TARGETS.items():
+        total = totals[name]
+        means = total[list(columns)].div(total["zones"], axis=0).round(decimals)
+        frames[name] = means.reset_index()
+    return frames, rows_read
+
+
+def import_export(path, anno=None, semester=None, chunksize=CHUNKSIZE):
+    """Import one export file into the store; returns the number of rows read."""
+    if anno is None or semester is None:
+        found = period_of(path)
+        if found is None:
+            raise ValueError(f"{path}: cannot tell the half-year from the file name, pass anno and semester")
+        anno, semester = anno or found[0], semester or found[1]
+    frames, rows_read = read_export(path, chunksize)
+    for name, df in frames.items():
+        target = store.ingest(name, df, semester, anno)
+        logger.info("%s: %d rows -> %s", name, len(df), target)
+    return rows_read
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import OMI quotation exports into the partitioned store")
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--anno", type=int, help="default: from the file name")
+    parser.add_argument("--semester", type=int, choices=(1, 2), help="default: from the file name")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    start = time.perf_counter()
+    rows = sum(import_export(path, args.anno, args.semester, args.chunksize) for path in args.files)
+    seconds = time.perf_counter() - start
+    print(f"{rows} rows in {seconds:.2f} s ({rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Indicators joining sale prices, rents and incomes per Gemeinde and year.
+
+Sale prices and rents are in one cube each, incomes in a wide table of the
+Gemeinden. They are aligned once on the axes of the price cube (Cod_Tip,
+Fascia, Stato, Gemeinde key, Anno) and the indicators computed for every
+cell, so a page only indexes into the result:
+
+- gross rent yield: twelve monthly rents per m² in percent of the sale price per m²
+- price-to-income ratio: price of a `REFERENZ_M2` m² dwelling in average annual incomes
+
+Cells without a price, rent or income are NaN.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from statistik import cube, data, einkommen, gemeinden, instrument
+
+
+# Size of the reference dwelling of the price-to-income ratio
+REFERENZ_M2 = 80
+
+# Selectbox labels of the page and the indicator they stand for
+INDIKATOREN = {
+    "Bruttomietrendite (%)": "rendite",
+    "Preis-Einkommen-Verhältnis (Gesamteinkommen)": "preis_einkommen_gesamt",
+    "Preis-Einkommen-Verhältnis (abhängige Beschäftigung)": "preis_einkommen_dipendente",
+}
+
+
+class IndicatorCube:
+    """Indicators indexed by (Cod_Tip, Fascia, Stato, gemeinde, Anno, indicator)."""
+
+    def __init__(self, axes, columns, values):
+        self.axes = axes
+        self.columns = tuple(columns)
+        self.values = values
+        self._positions = {key: {label: i for i, label in enumerate(labels)} for key, labels in axes.items()}
+        for array in (*self.axes.values(), self.values):
+            array.setflags(write=False)
+
+    @property
+    def gemeinden(self):
+        return self.axes["gemeinde_de"]
+
+    @property
+    def years(self):
+        return self.axes["Anno"]
+
+    def position(self, key, label):
+        try:
+            return self._positions[key][label]
+        except KeyError:
+            raise KeyError(f"{label!r} is not a value of {key}") from None
+
+    def slice(self, cod_tip, fascia, stato, indicator):
+        """Values of one indicator and selector combination as a (gemeinde, Anno) view."""
+        return self.values[
+            self.position("Cod_Tip", cod_tip),
+            self.position("Fascia", fascia),
+            self.position("Stato", stato),
+            ...,
+            self.columns.index(indicator),
+        ]
+
+    def years_with_data(self, cod_tip, fascia, stato, indicator):
+        present = ~np.isnan(self.slice(cod_tip, fascia, stato, indicator)).all(axis=0)
+        return self.years[present].tolist()
+
+    def ranking(self, cod_tip, fascia, stato, indicator, year):
+        """All Gemeinden with a value in `year`, highest first, as a series indexed by Gemeinde."""
+        values = self.slice(cod_tip, fascia, stato, indicator)[:, self.position("Anno", year)]
+        present = ~np.isnan(values)
+        ranking = pd.Series(values[present], index=pd.Index(self.gemeinden[present], name="gemeinde_de"))
+        return ranking.sort_values(ascending=False, kind="stable")
+
+    def series(self, cod_tip, fascia, stato, indicator, gemeinden):
+        """Years x `gemeinden` table of one indicator; years no Gemeinde has are dropped."""
+        values = self.slice(cod_tip, fascia, stato, indicator)
+        rows = [self.position("gemeinde_de", gemeinde) for gemeinde in gemeinden]
+        table = pd.DataFrame(values[rows].T, index=pd.Index(self.years, name="Anno"), columns=list(gemeinden))
+        return table.dropna(how="all")
+
+
+def _aligned(source, axes, column):
+    """`column` of the cube `source` on `axes`, NaN where `source` has no cell."""
+    shape = tuple(len(axes[key]) for key in cube.KEYS)
+    values = np.full(shape, np.nan)
+    target, origin = [], []
+    for key in cube.KEYS:
+        found = pd.Index(source.axes[key]).get_indexer(axes[key])
+        target.append(np.nonzero(found >= 0)[0])
+        origin.append(found[found >= 0])
+    values[np.ix_(*target)] = source.values[np.ix_(*origin)][..., source.columns.index(column)]
+    return values
+
+
+def _by_key(df):
+    df = df[df["gemeinde_id"] != gemeinden.NO_KEY]
+    return df.groupby(["Anno", "gemeinde_id"])[list(einkommen.ARTEN.values())].mean().unstack("gemeinde_id")
+
+
+def _income(axes, column):
+    # (gemeinde, Anno) of one income column, broadcast over the selector axes
+    wide = data.derived("all_comune", "by_gemeinde_id", _by_key)[column]
+    table = wide.reindex(index=axes["Anno"], columns=axes["gemeinde_id"])
+    return table.to_numpy(dtype=float).T
+
+
+@lru_cache(maxsize=1)
+def _build(preise, mieten, income_version):
+    # The cubes are part of the key, and the income version stands for the income table
+    axes = preise.axes
+    instrument.count("indikatoren_builds")
+    price = _aligned(preise, axes, "Compr_medio")
+    rent = _aligned(mieten, axes, "Average_Loc")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values = np.stack([
+            (rent * 12 / price * 100).round(2),
+            (price * REFERENZ_M2 / _income(axes, "medio_totale")).round(1),
+            (price * REFERENZ_M2 / _income(axes, "medio_dipendente")).round(1),
+        ], axis=-1)
+    return IndicatorCube(dict(axes), INDIKATOREN.values(), values)
+
+
+def get():
+    """The indicator cube of the current data, built once per data version."""
+    return _build(cube.get("preise_df"), cube.get("mietpreise"), data.version("all_comune"))
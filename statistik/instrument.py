@@ -0,0 +1,144 @@
+"""Named timing spans and counters for the stages of a page rerun.
+
+Recording is off by default and costs one attribute lookup per span then. It
+is switched on for every session with `STATISTIK_PROFILE=1`, or for a single
+session by opening a page with `?debug=1`. A page calls `begin` at the top and
+`finish` at the end; `finish` shows the timings in a sidebar panel and appends
+them as one JSON line to `STATISTIK_PROFILE_LOG` (default logs/timings.jsonl).
+
+    with instrument.span("filter"):
+        ...
+    instrument.count("rows", len(filtered_df))
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+
+PROFILE = os.environ.get("STATISTIK_PROFILE", "") not in ("", "0")
+LOG_PATH = Path(os.environ.get("STATISTIK_PROFILE_LOG", Path(__file__).resolve().parent.parent / "logs" / "timings.jsonl"))
+
+# Every session runs its page script in its own thread
+_local = threading.local()
+_log_lock = threading.Lock()
+_disabled = nullcontext()
+
+
+class Recorder:
+    """Spans and counters of one page rerun."""
+
+    def __init__(self, page):
+        self.page = page
+        self.start = time.perf_counter()
+        self.spans = {}
+        self.counters = {}
+
+    def add(self, name, seconds):
+        total, calls = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, calls + 1)
+
+    def count(self, name, n):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self):
+        return {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "page": self.page,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "spans": {name: {"ms": round(total * 1000, 3), "calls": calls} for name, (total, calls) in self.spans.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def _requested():
+    if PROFILE:
+        return True
+    import streamlit as st
+
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        # Not running inside a Streamlit session
+        return False
+
+
+def begin(page):
+    """Start recording a rerun of `page` if profiling is on for this session."""
+    _local.recorder = Recorder(page) if _requested() else None
+
+
+def span(name):
+    """Context manager timing the stage `name`; does nothing when not recording."""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is None:
+        return _disabled
+    return _Span(recorder, name)
+
+
+def count(name, n=1):
+    recorder = getattr(_local, "recorder", None)
+    if recorder is not None:
+        recorder.count(name, n)
+
+
+def finish():
+    """Show the rerun's timings in the sidebar and append them to the log."""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is None:
+        return None
+    _local.recorder = None
+    record = recorder.record()
+    _write(record)
+    _panel(record)
+    return record
+
+
+def _write(record):
+    try:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with _log_lock, open(LOG_PATH, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+def _panel(record):
+    import streamlit as st
+
+    from statistik import charts, warmup
+
+    with st.sidebar.expander("Debug: Laufzeiten", expanded=True):
+        st.markdown(f"**{record['page']}**: {record['total_ms']:.1f} ms")
+        st.table({
+            "Schritt": list(record["spans"]),
+            "ms": [round(span["ms"], 2) for span in record["spans"].values()],
+            "Aufrufe": [span["calls"] for span in record["spans"].values()],
+        })
+        if record["counters"]:
+            st.json(record["counters"])
+        st.caption("Figure-Cache: {hits} Treffer, {misses} Fehlgriffe, {size}/{maxsize} Einträge".format(**charts.FIGURES.stats()))
+        warm = warmup.status()
+        if warm["done"]:
+            st.caption(f"Daten vorgeladen in {warm['seconds']:.2f} s")
+        else:
+            st.caption(f"Vorladen läuft: {', '.join(warm['ready']) or 'noch nichts'} bereit")
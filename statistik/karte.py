@@ -0,0 +1,62 @@
+"""Values of one metric for every Gemeinde, for the map page.
+
+Prices, rents and the indicators of `statistik.indikatoren` share the axes of
+the OMI cubes, so the values of all Gemeinden for one selection and year are
+one slice of a cube. The geometry is not part of this: it is bundled in
+`static/` by `statistik.geometrie` and the map refers to it by URL.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from statistik import cube, indikatoren
+
+
+@dataclass(frozen=True)
+class Kennzahl:
+    """A metric the map can colour the Gemeinden by."""
+
+    source: str             # OMI dataset, or "indikatoren"
+    column: str             # value column of the cube
+    unit: str               # title of the colour bar
+    colorscale: str
+
+
+KENNZAHLEN = {
+    "Mittlerer Verkaufspreis": Kennzahl("preise_df", "Compr_medio", "€/m²", "YlOrRd"),
+    "Mittlerer Mietpreis": Kennzahl("mietpreise", "Average_Loc", "€/m² im Monat", "YlOrRd"),
+    "Bruttomietrendite (%)": Kennzahl("indikatoren", "rendite", "%", "Viridis"),
+    "Preis-Einkommen-Verhältnis (Gesamteinkommen)": Kennzahl("indikatoren", "preis_einkommen_gesamt", "Jahreseinkommen", "Viridis"),
+    "Preis-Einkommen-Verhältnis (abhängige Beschäftigung)": Kennzahl("indikatoren", "preis_einkommen_dipendente", "Jahreseinkommen", "Viridis"),
+}
+
+
+def _slice(kennzahl, cod_tip, fascia, stato):
+    # (gemeinde, Anno) values of the metric and the cube they come from
+    if kennzahl.source == "indikatoren":
+        source = indikatoren.get()
+        return source, source.slice(cod_tip, fascia, stato, kennzahl.column)
+    source = cube.get(kennzahl.source)
+    return source, source.slice(cod_tip, fascia, stato)[..., source.columns.index(kennzahl.column)]
+
+
+def years(label, cod_tip, fascia, stato):
+    """Years in which at least one Gemeinde has a value of the metric `label`."""
+    source, values = _slice(KENNZAHLEN[label], cod_tip, fascia, stato)
+    return source.years[~np.isnan(values).all(axis=0)].tolist()
+
+
+def values(label, cod_tip, fascia, stato, year):
+    """Frame of the Gemeinden with a value of the metric `label` in `year`.
+
+    Indexed by Gemeinde key, with the columns `gemeinde_de` and `value`.
+    """
+    source, table = _slice(KENNZAHLEN[label], cod_tip, fascia, stato)
+    column = table[:, source.position("Anno", year)]
+    present = ~np.isnan(column)
+    return pd.DataFrame(
+        {"gemeinde_de": source.gemeinden[present], "value": column[present]},
+        index=pd.Index(source.axes["gemeinde_id"][present], name="gemeinde_id"),
+    )
@@ -0,0 +1,247 @@
+"""Comparison engine shared by the OMI price and rent pages.
+
+Both pages show the same thing for a different dataset: the yearly middle
+value of up to three Gemeinden against the average of all Gemeinden, and the
+Gemeinden with the highest and lowest values. A `Dataset` describes what
+differs between them; `compare` computes everything a page shows for one
+selection.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+
+from statistik import cube, instrument
+
+
+LABELS = ("Minimum", "Mittelwert", "Maximum")
+
+# Selectbox labels of the pages and the OMI codes they stand for
+TYPEN = {
+    "Privatwohnungen": 20,
+    "Villen und Einfamilienhäuser": 1,
+    "Büros": 6,
+    "Geschäfte": 5,
+    "Garagen": 13,
+    "Magazine": 9,
+}
+
+ZONEN = {
+    "Zentral": "B",
+    "Halbzentral": "C",
+    "Peripher": "D",
+    "Suburban": "E",
+    "Extraurban": "R",
+}
+
+ZUSTAENDE = {
+    "Normal": "NORMALE",
+    "Ausgezeichnet": "OTTIMO",
+}
+
+# Selectbox labels of the rankings and the growth span they stand for: None
+# ranks by the middle value, 1 by the change from the previous year, and
+# "jahre" by the average annual growth over a number of years chosen separately
+RANGLISTEN = {
+    "Mittelwert": None,
+    "Veränderung zum Vorjahr": 1,
+    "Durchschnittliches jährliches Wachstum": "jahre",
+}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """What distinguishes one OMI page from the other."""
+
+    name: str
+    columns: tuple          # minimum, middle and maximum value column
+    mean_label: str         # column of the average in the comparison table
+    value_label: str        # column of the middle value in the ranking tables
+    tick_step: float        # distance between the y-axis ticks of the line chart
+    title: str              # title of the line chart
+    unit: str               # unit of the values
+    value_format: str       # d3 format of a value in hover labels
+
+
+PREISE = Dataset(
+    name="preise_df",
+    columns=("Compr_min", "Compr_medio", "Compr_max"),
+    mean_label="Mittelwert Durchschnitt",
+    value_label="Mittelwert Verkaufspreis",
+    tick_step=500,
+    title="Vergleich der mittleren Verkaufspreise als Liniendiagramm",
+    unit="€/m²",
+    value_format=".0f",
+)
+
+MIETEN = Dataset(
+    name="mietpreise",
+    columns=("Loc_min", "Average_Loc", "Loc_max"),
+    mean_label="Durchschnitt Gemeinden",
+    value_label="Mittelwert Mietpreis",
+    tick_step=1,
+    title="Vergleich der mittleren Mietpreise als Liniendiagramm",
+    unit="€/m² im Monat",
+    value_format=".2f",
+)
+
+
+@dataclass(frozen=True)
+class Comparison:
+    """Everything an OMI page shows for one selection."""
+
+    gemeinden: tuple        # selected Gemeinden without duplicates, in selection order
+    table: pd.DataFrame     # see `comparison_table`
+    average: pd.DataFrame   # `Anno` and the average middle value of all Gemeinden
+    top: pd.DataFrame       # `Rang`, `Gemeinde` and `value_label`, highest first
+    bottom: pd.DataFrame    # the same, lowest first
+    ranking_year: object     # a year, or a half-year label such as "2023/1"
+
+
+@dataclass(frozen=True)
+class Ranking:
+    """Top and bottom `k` Gemeinden of one selection, year and ranking criterion."""
+
+    year: object            # a year, or a half-year label; None if there are no values
+    top: pd.DataFrame       # `Rang`, `Gemeinde` and `value_label`, highest first
+    bottom: pd.DataFrame    # the same, lowest first
+    value_label: str
+
+
+def _per_gemeinde(filtered_df, columns):
+    # A Gemeinde with several rows in a year (several OMI microzones in one
+    # Fascia) counts with the mean of those rows
+    return filtered_df.groupby(['Anno', 'gemeinde_de'], observed=True)[list(columns)].mean()
+
+
+def _average(per_gemeinde, column):
+    return per_gemeinde[column].groupby(level='Anno').mean().round(0)
+
+
+def comparison_table(filtered_df, gemeinden, columns, mean_label, average=None):
+    """Yearly values of `gemeinden` side by side, plus the average of all Gemeinden.
+
+    `filtered_df` holds the rows of one selector combination and `columns` are
+    its minimum, middle and maximum value column. Only years in which every
+    selected Gemeinde has a value are kept. `average` is the yearly average of
+    all Gemeinden if it has been computed already.
+
+    The result has a `Jahr` column, `Minimum/Mittelwert/Maximum <Gemeinde>`
+    for each Gemeinde in the given order and `mean_label` for the average.
+    """
+    gemeinden = list(dict.fromkeys(gemeinden))
+    columns = list(columns)
+    selected = filtered_df[filtered_df['gemeinde_de'].isin(gemeinden)]
+    per_gemeinde = _per_gemeinde(selected, columns)
+    if average is None:
+        average = _average(_per_gemeinde(filtered_df, columns), columns[1])
+
+    wide = per_gemeinde.unstack('gemeinde_de')
+    wide = wide.reindex(columns=pd.MultiIndex.from_product([columns, gemeinden]))
+    wide = wide.dropna(subset=[(columns[1], gemeinde) for gemeinde in gemeinden])
+
+    table = pd.DataFrame(index=wide.index)
+    for gemeinde in gemeinden:
+        for label, column in zip(LABELS, columns):
+            table[f'{label} {gemeinde}'] = wide[(column, gemeinde)]
+    table[mean_label] = average.reindex(table.index)
+
+    table = table.sort_index().reset_index()
+    table['Anno'] = table['Anno'].astype(str)
+    return table.rename(columns={'Anno': 'Jahr'})
+
+
+def _ranking(values, value_label):
+    return pd.DataFrame({
+        'Rang': range(1, len(values) + 1),
+        'Gemeinde': values.index.tolist(),
+        value_label: values.to_numpy(),
+    })
+
+
+def value_label(dataset, span=None):
+    """Column of the ranked value: the middle value, or the growth over `span` years."""
+    if span is None:
+        return dataset.value_label
+    if span == 1:
+        return "Veränderung zum Vorjahr (%)"
+    return f"Wachstum pro Jahr über {span} Jahre (%)"
+
+
+def ranking(dataset, cod_tip, fascia, stato, year=None, k=5, span=None, both_semesters=False):
+    """Top and bottom `k` Gemeinden in `year`, by default the most recent year with values.
+
+    Ranked by the middle value, or with `span` by its average annual growth
+    over the `span` years up to `year` (only without `both_semesters`). Every
+    ranking is a lookup into orders computed for all selections at once.
+    """
+    return _ranking_of(cube.get(dataset.name, both_semesters), dataset, cod_tip, fascia, stato, year, k, span)
+
+
+def ranking_years(dataset, cod_tip, fascia, stato, span=None, both_semesters=False):
+    """Years that `ranking` can rank for the selector combination, oldest first."""
+    return cube.get(dataset.name, both_semesters).years_with_values(cod_tip, fascia, stato, span)
+
+
+@lru_cache(maxsize=512)
+def _ranking_of(data_cube, dataset, cod_tip, fascia, stato, year, k, span):
+    selection = (cod_tip, fascia, stato)
+    label = value_label(dataset, span)
+    with instrument.span("rankings"):
+        if year is None:
+            year = data_cube.latest_year(*selection, span=span)
+        if year is None:
+            # No Gemeinde has a value for this combination
+            top = bottom = pd.Series(dtype=float)
+        else:
+            top = data_cube.ranking(*selection, year, k, span=span)
+            bottom = data_cube.ranking(*selection, year, k, highest=False, span=span)
+    return Ranking(year=year, top=_ranking(top, label), bottom=_ranking(bottom, label), value_label=label)
+
+
+def normalize(gemeinden):
+    """Selected Gemeinden as a sorted tuple without duplicates, for cache keys."""
+    return tuple(sorted(set(gemeinden)))
+
+
+def gemeinden(dataset, cod_tip, fascia, stato, both_semesters=False):
+    """Gemeinden with values for the selector combination, for the selectboxes."""
+    data_cube = cube.get(dataset.name, both_semesters)
+    with instrument.span("filter"):
+        return data_cube.members(cod_tip, fascia, stato)
+
+
+def compare(dataset, cod_tip, fascia, stato, gemeinden, ranking_year=None, k=5, both_semesters=False):
+    """Compute the comparison of `gemeinden` for one selector combination.
+
+    The rankings are for `ranking_year`, by default the most recent year with
+    data. With `both_semesters` the years are half-years such as "2023/1".
+    Results are cached per selection, so a rerun with unchanged selectboxes
+    does no work at all.
+    """
+    return _compare(cube.get(dataset.name, both_semesters), dataset, cod_tip, fascia, stato,
+                    tuple(dict.fromkeys(gemeinden)), ranking_year, k)
+
+
+# The cube is part of the key so that results of an invalidated dataset are never reused
+@lru_cache(maxsize=512)
+def _compare(data_cube, dataset, cod_tip, fascia, stato, gemeinden, ranking_year, k):
+    selection = (cod_tip, fascia, stato)
+    with instrument.span("filter"):
+        filtered_df = data_cube.frame(*selection)
+        average = data_cube.average(*selection)
+    instrument.count("rows", len(filtered_df))
+
+    with instrument.span("pivot"):
+        table = comparison_table(filtered_df, gemeinden, dataset.columns, dataset.mean_label, average)
+
+    rankings = _ranking_of(data_cube, dataset, cod_tip, fascia, stato, ranking_year, k, None)
+    return Comparison(
+        gemeinden=gemeinden,
+        table=table,
+        average=average.rename(dataset.columns[1]).reset_index(),
+        top=rankings.top,
+        bottom=rankings.bottom,
+        ranking_year=rankings.year,
+    )
@@ -0,0 +1,114 @@
+"""The body of the two OMI pages, shared by `Immobilienpreise.py` and `pages/Mietpreise.py`.
+
+The page scripts set up the page and write their introduction; `page` then
+draws the selectors, the comparison chart, the overview and the rankings of
+one `omi.Dataset`.
+"""
+
+from statistik import charts, instrument, omi, store, uebersicht, urlstate
+
+
+def _selectors():
+    import streamlit as st
+
+    st.subheader("Wählen Sie den Typ der Immobilie")
+    col1, col2, col3 = st.columns(3)
+    # The selection is read from and written to the URL, see statistik.urlstate
+    urlstate.seed("typ", omi.TYPEN, default=urlstate.default_at(omi.TYPEN, 0))
+    urlstate.seed("zone", omi.ZONEN, default=urlstate.default_at(omi.ZONEN, 0))
+    urlstate.seed("zustand", omi.ZUSTAENDE, default=urlstate.default_at(omi.ZUSTAENDE, 0))
+    with col1:
+        typ_immobilie = st.selectbox("Art der Immobilie", tuple(omi.TYPEN), key="typ")
+    with col2:
+        zone = st.selectbox("Zone der Immobilie", tuple(omi.ZONEN), key="zone")
+    with col3:
+        zustand = st.selectbox("Zustand der Immobilie", tuple(omi.ZUSTAENDE), key="zustand")
+    return omi.TYPEN[typ_immobilie], omi.ZONEN[zone], omi.ZUSTAENDE[zustand]
+
+
+def _gemeinden(options):
+    import streamlit as st
+
+    st.subheader("Vergleich von Gemeinden")
+    # Fewer than three Gemeinden in some combinations: the last one is repeated
+    for position in range(3):
+        urlstate.seed(f"gemeinde{position + 1}", options,
+                      default=urlstate.default_at(options, position), param="gemeinde", position=position)
+    placeholders = ("Gemeinde", "Benchmark Gemeinde", "Benchmark Gemeinde")
+    selected = []
+    for position, column in enumerate(st.columns(3)):
+        with column:
+            selected.append(st.selectbox(
+                f"Gemeinde {position + 1}",
+                options=options,
+                placeholder=placeholders[position],
+                key=f"gemeinde{position + 1}",
+            ))
+    return selected
+
+
+def _rankings(dataset, selection, beide_halbjahre):
+    import streamlit as st
+
+    st.subheader("Ranglisten")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        # Growth rates need whole years
+        rangliste = st.selectbox("Rangliste nach", tuple(omi.RANGLISTEN) if not beide_halbjahre else ("Mittelwert",), index=0)
+        spanne = omi.RANGLISTEN[rangliste]
+        if spanne == "jahre":
+            spanne = st.slider("Zeitraum in Jahren", min_value=2, max_value=10, value=5)
+
+    ranking_jahre = omi.ranking_years(dataset, *selection, spanne, beide_halbjahre)
+    with col2:
+        ranking_jahr = st.selectbox("Jahr der Rangliste", ranking_jahre, index=max(len(ranking_jahre) - 1, 0))
+    with col3:
+        anzahl = st.number_input("Anzahl Gemeinden", min_value=1, max_value=50, value=5)
+
+    if ranking_jahr is None:
+        st.info("Für diese Auswahl gibt es keine Werte.")
+        return
+    top_table, bottom_table = charts.ranking_figures(dataset, *selection, ranking_jahr, int(anzahl), spanne, beide_halbjahre)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(top_table, use_container_width=True)
+        st.plotly_chart(bottom_table, use_container_width=True)
+
+
+def page(dataset):
+    """Draw the selectors, charts and rankings of `dataset` and write the selection to the URL."""
+    import streamlit as st
+    import streamlit.components.v1 as components
+
+    st.markdown("<div style='margin: 50px;'></div>", unsafe_allow_html=True)
+    selection = _selectors()
+
+    # Only offered once the first-half releases have been ingested into the store
+    if len(store.semesters(dataset.name)) > 1:
+        urlstate.seed_flag("halbjahre")
+        beide_halbjahre = st.checkbox("Beide Halbjahre anzeigen", key="halbjahre")
+    else:
+        beide_halbjahre = False
+
+    gemeinden = _gemeinden(omi.gemeinden(dataset, *selection, beide_halbjahre))
+
+    fig = charts.line_figure(dataset, *selection, gemeinden, beide_halbjahre)
+    with instrument.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Every Gemeinde of the selection in one WebGL chart; hovering a line highlights it
+    if st.checkbox("Alle Gemeinden im Überblick anzeigen", value=False):
+        overview_html, payload = charts.overview(dataset, *selection, beide_halbjahre)
+        instrument.count("overview_bytes", payload)
+        with instrument.span("overview"):
+            components.html(overview_html, height=uebersicht.HEIGHT + 30)
+
+    st.markdown("<div style='margin: 50px;'></div>", unsafe_allow_html=True)
+    _rankings(dataset, selection, beide_halbjahre)
+
+    urlstate.finish({
+        "typ": "typ",
+        "zone": "zone",
+        "zustand": "zustand",
+        "halbjahre": "halbjahre",
+        "gemeinde": ("gemeinde1", "gemeinde2", "gemeinde3"),
+    })
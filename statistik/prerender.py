@@ -0,0 +1,180 @@
+"""Static bundle of the default view of every OMI selector combination.
+
+Each OMI page has 60 (Cod_Tip, Fascia, Stato) combinations, and most visits
+never change the preselected Gemeinden (the first three of the selectbox).
+`export` renders that default view of every combination of both pages, in
+parallel worker processes forked after the data has been loaded, to
+
+    static/prerender/manifest.json
+    static/prerender/<preise|mieten>/<Cod_Tip>_<Fascia>_<Stato>.json    line chart, top and bottom table as plotly JSON
+    static/prerender/<preise|mieten>/<Cod_Tip>_<Fascia>_<Stato>.html    the same as a page of its own
+
+which any file server can answer without pandas or plotly in Python.
+Streamlit serves it under `app/static/prerender/`.
+
+The manifest records a fingerprint of the contents of every dataset the
+bundle was made from. `is_fresh` compares it with the loaded data, and `check`
+exits non-zero when the bundle is missing or stale, for use in a deploy step.
+
+    python -m statistik.prerender [--workers N]
+    python -m statistik.prerender check
+"""
+
+import argparse
+import hashlib
+import html
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from statistik import charts, data, geometrie, omi, schema, warmup
+
+
+OUT_DIR = geometrie.STATIC_DIR / "prerender"
+MANIFEST_PATH = OUT_DIR / "manifest.json"
+
+# Changes whenever the layout of the bundle changes
+FORMAT = 1
+
+DATASETS = {"preise": omi.PREISE, "mieten": omi.MIETEN}
+
+
+def combinations():
+    """Every (Cod_Tip, Fascia, Stato) combination of the selectboxes."""
+    return list(itertools.product(omi.TYPEN.values(), omi.ZONEN.values(), omi.ZUSTAENDE.values()))
+
+
+def _fingerprint(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def fingerprint(name):
+    """SHA-256 over the rows of the loaded dataset `name`, computed once per data version."""
+    return data.derived(name, "fingerprint", _fingerprint)
+
+
+def fingerprints():
+    return {dataset.name: f"{fingerprint(dataset.name)}:{schema.VERSION}:{FORMAT}" for dataset in DATASETS.values()}
+
+
+def stem(cod_tip, fascia, stato):
+    return f"{cod_tip}_{fascia}_{stato}"
+
+
+def _page(title, figures):
+    parts = [f"<h1>{html.escape(title)}</h1>"]
+    parts.extend(fig.to_html(full_html=False, include_plotlyjs=False) for fig in figures)
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{html.escape(title)}</title><script src='../plotly.min.js'></script></head>"
+        f"<body>{''.join(parts)}</body></html>"
+    )
+
+
+def render(key, combination):
+    """Write the bundle files of one combination; returns its manifest entry."""
+    dataset = DATASETS[key]
+    gemeinden = omi.gemeinden(dataset, *combination)[:3]
+    comparison = omi.compare(dataset, *combination, gemeinden)
+    if comparison.table.empty:
+        # No Gemeinde, or no year in which all preselected ones have a value
+        return {"gemeinden": [], "ranking_year": None}
+
+    line, top, bottom = charts.omi_figures(dataset, *combination, gemeinden)
+    target = OUT_DIR / key / stem(*combination)
+    target.with_suffix(".json").write_text(
+        '{"line":%s,"top":%s,"bottom":%s}' % (line.to_json(), top.to_json(), bottom.to_json()),
+        encoding="utf-8",
+    )
+    title = f"{dataset.title}: {', '.join(omi.normalize(gemeinden))}"
+    target.with_suffix(".html").write_text(_page(title, (line, top, bottom)), encoding="utf-8")
+    return {"gemeinden": list(omi.normalize(gemeinden)), "ranking_year": comparison.ranking_year}
+
+
+def _render(task):
+    key, combination = task
+    return key, stem(*combination), render(key, combination)
+
+
+def export(workers=None):
+    """Render every combination of both pages and write the manifest; returns the manifest."""
+    warmup.warm_up()
+    for key in DATASETS:
+        (OUT_DIR / key).mkdir(parents=True, exist_ok=True)
+    from plotly.offline import get_plotlyjs
+
+    (OUT_DIR / "plotly.min.js").write_text(get_plotlyjs(), encoding="utf-8")
+
+    tasks = [(key, combination) for key in DATASETS for combination in combinations()]
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        results = [_render(task) for task in tasks]
+    else:
+        # Forked after the warm-up, so every worker starts with the cubes built
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            results = list(pool.map(_render, tasks, chunksize=4))
+
+    manifest = {
+        "format": FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fingerprints": fingerprints(),
+        "combinations": {key: {} for key in DATASETS},
+    }
+    for key, name, entry in results:
+        manifest["combinations"][key][name] = entry
+    # The manifest goes last: a bundle without one is never considered fresh
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(MANIFEST_PATH)
+    return manifest
+
+
+def manifest():
+    """The manifest of the bundle, or None if there is none."""
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def stale():
+    """Datasets whose bundle does not match the loaded data; every dataset if there is no bundle."""
+    current = manifest()
+    recorded = (current or {}).get("fingerprints", {})
+    return [name for name, value in fingerprints().items() if recorded.get(name) != value]
+
+
+def is_fresh():
+    return not stale()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs="?", choices=("export", "check"), default="export")
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        outdated = stale()
+        if outdated:
+            sys.exit(f"bundle in {OUT_DIR} is stale for {', '.join(outdated)}; run python -m statistik.prerender")
+        print(f"bundle in {OUT_DIR} matches the current data")
+        return
+
+    start = time.perf_counter()
+    result = export(args.workers)
+    seconds = time.perf_counter() - start
+    rendered = sum(bool(entry["gemeinden"]) for entries in result["combinations"].values() for entry in entries.values())
+    total = sum(len(entries) for entries in result["combinations"].values())
+    print(f"{rendered} of {total} combinations rendered in {seconds:.1f} s to {OUT_DIR} (the others have no data)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,219 @@
+"""Pick up new versions of the datasets on GitHub while the app is running.
+
+The xlsx files are maintained in the GitHub repository behind
+`data.REMOTE_URL`. `start` polls them in a background thread every
+`STATISTIK_REFRESH_INTERVAL` seconds (default 15 minutes, 0 turns polling
+off) with conditional requests: the ETag and Last-Modified of the last
+response go out as If-None-Match and If-Modified-Since, and an unchanged file
+costs a 304 without a body. Only a changed file is parsed, and its cube built,
+in the polling thread; `data.replace` then swaps frame and cube in together.
+Sessions keep reading the previous version until the swap and never wait for
+the refresh, and every cache of the pages and the API is keyed by
+`data.version`, so the next rerun shows the new data.
+
+The first poll has no validators. Its response is compared with the file the
+loaded data was read from and only parsed if it differs. Datasets in the
+partitioned store of `statistik.store` are not polled; `store.refresh` merges
+the partitions written since they were read instead.
+
+    python -m statistik.refresh [--once] [--interval SECONDS]
+"""
+
+import argparse
+import hashlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+
+from statistik import cube, data, instrument
+
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = float(os.environ.get("STATISTIK_REFRESH_INTERVAL", 15 * 60))
+TIMEOUT = 30
+
+_lock = threading.Lock()
+_thread = None
+_stop = threading.Event()
+# Per dataset: validators and SHA-256 of the file the loaded data was read from
+_state = {}
+
+
+def _remember(name, **values):
+    with _lock:
+        _state.setdefault(name, {}).update(values)
+
+
+def _validators(name):
+    with _lock:
+        state = _state.get(name, {})
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+
+def _loaded_sha256(name):
+    with _lock:
+        sha256 = _state.get(name, {}).get("sha256")
+    if sha256 is None:
+        src = data.source(name)
+        if isinstance(src, Path):
+            from statistik import snapshot
+
+            sha256 = snapshot.fingerprint(src)
+    return sha256
+
+
+def fetch(name, conditional=True):
+    """GET the remote file of `name`; returns its bytes, or None if it is unchanged (304).
+
+    The validators of the response are kept for the next conditional request.
+    """
+    url = data.REMOTE_URL.format(name=name)
+    request = urllib.request.Request(url, headers=_validators(name) if conditional else {})
+    try:
+        with instrument.span("download"), urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+            body = response.read()
+            headers = response.headers
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304:
+            return None
+        raise
+    _remember(name, etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"))
+    return body
+
+
+def parse(name, body):
+    """The prepared frame of the downloaded file `body`."""
+    with instrument.span("read_excel"):
+        return data.prepare(name, pd.read_excel(io.BytesIO(body)))
+
+
+def download(name):
+    """Download and parse `name` unconditionally, for a first load without a bundled file."""
+    body = fetch(name, conditional=False)
+    _remember(name, sha256=hashlib.sha256(body).hexdigest())
+    return parse(name, body)
+
+
+def _build_derived(name, df):
+    if name not in cube.VALUE_COLUMNS:
+        return {}
+    with instrument.span("build_cube"):
+        return {"cube": cube.Cube.from_frame(df, cube.VALUE_COLUMNS[name])}
+
+
+def check(name):
+    """Poll `name` once and swap in a changed file; returns True if the data was replaced."""
+    from statistik import store
+
+    if store.serves(name):
+        return bool(store.refresh(name))
+
+    body = fetch(name)
+    _remember(name, checked=time.time())
+    if body is None:
+        return False
+    sha256 = hashlib.sha256(body).hexdigest()
+    if sha256 == _loaded_sha256(name):
+        _remember(name, sha256=sha256)
+        return False
+
+    df = parse(name, body)
+    derived = _build_derived(name, df)
+    data.replace(name, df, derived)
+    _remember(name, sha256=sha256, replaced=time.time())
+    logger.info("%s: new version from %s swapped in", name, data.REMOTE_URL.format(name=name))
+    return True
+
+
+def check_all():
+    """Poll every dataset once; returns the names of the replaced ones.
+
+    A failed request is logged and leaves the dataset as it is.
+    """
+    replaced = []
+    for name in data.DATASETS:
+        try:
+            if check(name):
+                replaced.append(name)
+            _remember(name, error=None)
+        except Exception as exc:
+            logger.warning("refresh of %s failed: %s", name, exc)
+            _remember(name, error=repr(exc))
+    return replaced
+
+
+def _run(interval):
+    from statistik import warmup
+
+    # Polls from the first interval on; the first loads come from the bundled files
+    warmup.wait()
+    while not _stop.wait(interval):
+        check_all()
+
+
+def start(interval=None):
+    """Start polling in a background thread, once per process; None if polling is off."""
+    global _thread
+    interval = INTERVAL if interval is None else interval
+    if interval <= 0:
+        return None
+    with _lock:
+        if _thread is None:
+            _stop.clear()
+            _thread = threading.Thread(target=_run, args=(interval,), name="statistik-refresh", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def stop():
+    """Stop the polling thread started by `start`."""
+    global _thread
+    _stop.set()
+    with _lock:
+        thread, _thread = _thread, None
+    if thread is not None:
+        thread.join()
+
+
+def status():
+    """Validators, last check, last swap and last error of every polled dataset."""
+    with _lock:
+        return {name: dict(state) for name, state in _state.items()}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--once", action="store_true", help="poll once and exit")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="seconds between two polls")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from statistik import warmup
+
+    warmup.warm_up()
+    while True:
+        began = time.perf_counter()
+        replaced = check_all()
+        seconds = time.perf_counter() - began
+        print(f"checked {len(data.DATASETS)} datasets in {seconds:.2f} s, replaced: {', '.join(replaced) or 'none'}")
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
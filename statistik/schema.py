@@ -0,0 +1,104 @@
+"""Column dtypes of the bundled datasets.
+
+`pd.read_excel` gives every text column an object/string dtype and every
+number int64 or float64, although the key columns have only a handful of
+distinct values. `compact` assigns categoricals, small integers and float32
+per dataset, which shrinks the frames held in memory by the server.
+
+    python -m statistik.schema    # memory before and after conversion
+"""
+
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the schema changes so that stored snapshots are rebuilt
+VERSION = "2"
+
+_INCOME = {
+    "Anno": "int16",
+    "medio_fabbricati": "int32",
+    "medio_dipendente": "int32",
+    "medio_autonomo": "int32",
+    "medio_impr_normale": "int32",
+    "medio_impr_semplice": "int32",
+    "medio_pensione": "int32",
+    "medio_totale": "int32",
+}
+
+SCHEMAS = {
+    "preise_df": {
+        "Anno": "int16",
+        "gemeinde_de": "category",
+        "gemeinde_id": "int16",
+        "Fascia": "category",
+        "Stato": "category",
+        "Cod_Tip": "int8",
+        "Compr_min": "float32",
+        "Compr_medio": "float32",
+        "Compr_max": "float32",
+    },
+    "mietpreise": {
+        "gemeinde_de": "category",
+        "gemeinde_id": "int16",
+        "Anno": "int16",
+        "Fascia": "category",
+        "Cod_Tip": "int8",
+        "Stato": "category",
+        "Loc_min": "float32",
+        "Loc_max": "float32",
+        "Average_Loc": "float32",
+    },
+    "all_comune": {"Comune_DE": "category", "gemeinde_id": "int16", **_INCOME},
+    "all_region": {"Regione": "category", **_INCOME},
+}
+
+
+def memory_usage(df):
+    """Bytes held by `df`, including the strings behind object columns."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compact(df, name, float64=False):
+    """Return `df` with the dtypes of the schema for `name`.
+
+    With `float64=True` the value columns keep double precision. Columns that
+    are not part of the schema are left as they are.
+    """
+    schema = SCHEMAS.get(name, {})
+    dtypes = {}
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if float64 and dtype == "float32":
+            dtype = "float64"
+        dtypes[column] = dtype
+    before = memory_usage(df)
+    df = df.astype(dtypes)
+    after = memory_usage(df)
+    logger.info("%s: %.2f MB -> %.2f MB", name, before / 1e6, after / 1e6)
+    return df
+
+
+def is_float32(df, columns):
+    return all(df[column].dtype == np.float32 for column in columns)
+
+
+def main(names):
+    from statistik import data
+
+    names = names or data.DATASETS
+    print(f"{'dataset':<12} {'read_excel':>12} {'float64':>12} {'float32':>12}")
+    for name in names:
+        df = pd.read_excel(data.DATA_DIR / f"{name}.xlsx")
+        sizes = [memory_usage(df), memory_usage(compact(df, name, float64=True)), memory_usage(compact(df, name))]
+        print(f"{name:<12} " + " ".join(f"{size / 1e6:>10.2f}MB" for size in sizes))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
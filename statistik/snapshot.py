@@ -0,0 +1,96 @@
+"""Typed columnar snapshots of the bundled xlsx files.
+
+Parsing the xlsx files with openpyxl is the most expensive step of a cold
+start. Each file is converted once into an uncompressed Arrow IPC (Feather v2)
+file next to it, which is memory-mapped instead of parsed. The
+xlsx files stay authoritative: every snapshot records the SHA-256 of the file
+it was made from and is ignored as soon as that no longer matches.
+
+    python -m statistik.snapshot    # (re)convert every bundled dataset
+"""
+
+import hashlib
+import logging
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from statistik import data
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = data.DATA_DIR / "snapshots"
+_STAMP_KEY = b"source_sha256"
+
+
+def fingerprint(path):
+    """SHA-256 of the source file, used to detect stale snapshots."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def path_for(name):
+    return SNAPSHOT_DIR / f"{name}.arrow"
+
+
+def _stamp(source_path, version):
+    return f"{fingerprint(source_path)}:{version}".encode()
+
+
+def write(name, df, source_path, version=""):
+    """Write `df` as the snapshot of `source_path`.
+
+    `version` identifies how `df` was derived from the file; a snapshot is only
+    used again for the same source contents and the same version.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_STAMP_KEY] = _stamp(source_path, version)
+    table = table.replace_schema_metadata(metadata)
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    target = path_for(name)
+    tmp = target.with_suffix(".arrow.tmp")
+    # Uncompressed so the file can be memory-mapped without decoding
+    feather.write_feather(table, tmp, compression="uncompressed")
+    tmp.replace(target)
+    return target
+
+
+def is_fresh(name, source_path, version=""):
+    target = path_for(name)
+    if not target.exists():
+        return False
+    schema = feather.read_table(target, columns=[], memory_map=True).schema
+    return (schema.metadata or {}).get(_STAMP_KEY) == _stamp(source_path, version)
+
+
+def read(name, source_path, version=""):
+    """Read the snapshot of `source_path`, or return None if it is missing or stale.
+
+    The file is memory-mapped rather than read into memory first.
+    """
+    if not is_fresh(name, source_path, version):
+        return None
+    table = feather.read_table(path_for(name), memory_map=True)
+    return table.to_pandas()
+
+
+def convert(name):
+    """Parse the bundled xlsx for `name` and write its snapshot."""
+    source_path = data.DATA_DIR / f"{name}.xlsx"
+    df = data.prepare(name, pd.read_excel(source_path))
+    target = write(name, df, source_path, version=data.snapshot_version())
+    logger.info("wrote %s (%d rows)", target, len(df))
+    return target
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for name in sys.argv[1:] or data.DATASETS:
+        convert(name)
@@ -0,0 +1,256 @@
+"""Partitioned store of the OMI datasets, one file per (Anno, semester).
+
+OMI publishes its quotations every half-year. Instead of regenerating the
+monolithic xlsx files, each release is ingested as one partition
+
+    data/store/<dataset>/anno=<Anno>/semester=<1|2>/part.arrow
+
+next to the existing ones, which are never rewritten. Once a dataset has a
+store, `data.load` reads it instead of the xlsx file: only the partitions of
+`data.SEMESTER`, memory-mapped, so the default view costs no more than before.
+The view of both semesters is read and indexed only when a page asks for it.
+
+In a process that already holds the data, `refresh` picks up new or changed
+partitions and rebuilds only the affected year of the cubes and aggregates.
+
+    python -m statistik.store seed                 # split the bundled xlsx files into partitions
+    python -m statistik.store ingest preise_df 2024-1.xlsx --anno 2024 --semester 1
+    python -m statistik.store list
+"""
+
+import argparse
+import logging
+import re
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from statistik import data, schema
+
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = data.DATA_DIR / "store"
+DATASETS = ("preise_df", "mietpreise")
+
+_PARTITION = re.compile(r"anno=(\d+)/semester=([12])$")
+
+# (Anno, semester) -> mtime of every partition this process has read, per dataset
+_seen = {}
+_seen_lock = threading.Lock()
+
+
+def path_for(name, anno, semester):
+    return STORE_DIR / name / f"anno={anno}" / f"semester={semester}" / "part.arrow"
+
+
+def period(anno, semester):
+    """Label of one half-year on the time axis of the view of both semesters."""
+    return f"{anno}/{semester}"
+
+
+def partitions(name):
+    """{(Anno, semester): mtime} of the partitions of `name` on disk."""
+    found = {}
+    for path in (STORE_DIR / name).glob("anno=*/semester=*/part.arrow"):
+        match = _PARTITION.search(path.parent.relative_to(STORE_DIR / name).as_posix())
+        if match:
+            found[int(match[1]), int(match[2])] = path.stat().st_mtime_ns
+    return dict(sorted(found.items()))
+
+
+def exists(name):
+    return name in DATASETS and (STORE_DIR / name).is_dir() and bool(partitions(name))
+
+
+def serves(name):
+    """True if `data.load` reads `name` from the store, i.e. it has partitions of `data.SEMESTER`."""
+    return exists(name) and data.SEMESTER in semesters(name)
+
+
+def semesters(name):
+    """Semesters with at least one partition, e.g. (2,) or (1, 2)."""
+    return tuple(sorted({semester for _, semester in partitions(name)}))
+
+
+def write_partition(name, anno, semester, df):
+    """Write the rows of one half-year; `Anno` and the semester are kept in the path only.
+
+    The columns are written in the order of the schema, whatever the order of
+    the file they came from.
+    """
+    target = path_for(name, anno, semester)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    columns = [column for column in schema.SCHEMAS[name] if column in df.columns and column != "Anno"]
+    columns += [column for column in df.columns if column not in columns and column not in ("Anno", "semester")]
+    table = pa.Table.from_pandas(df[columns], preserve_index=False)
+    tmp = target.with_suffix(".arrow.tmp")
+    # Uncompressed so the file can be memory-mapped without decoding, like the snapshots
+    feather.write_feather(table, tmp, compression="uncompressed")
+    tmp.replace(target)
+    return target
+
+
+def _read_partition(name, anno, semester):
+    table = feather.read_table(path_for(name, anno, semester), memory_map=True)
+    table = table.add_column(0, "Anno", pa.array([anno] * table.num_rows, pa.int16()))
+    return table.append_column("semester", pa.array([semester] * table.num_rows, pa.int8()))
+
+
+def read(name, semesters=None):
+    """Rows of all partitions of `name`, or only of `semesters`, with a `semester` column."""
+    found = {key: mtime for key, mtime in partitions(name).items() if semesters is None or key[1] in semesters}
+    if not found:
+        raise FileNotFoundError(f"no partitions of {name!r} in {STORE_DIR}")
+    # Concatenated as Arrow tables: the categories of the partitions are unified
+    # once instead of falling back to object columns in pandas. Partitions
+    # written before a schema change may lack columns, order them differently
+    # or use wider types; fields are matched by name and promoted
+    tables = [_read_partition(name, *key) for key in found]
+    table = pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+    with _seen_lock:
+        _seen.setdefault(name, {}).update(found)
+    # Missing columns such as the Gemeinde key and the dtypes of the schema come from here
+    return data.prepare(name, table.to_pandas())
+
+
+def periods(name, default):
+    """Rows of both semesters, with `Anno` replaced by the half-year label.
+
+    `default` is the frame of `data.load`, used when `name` has no store and
+    therefore only one semester.
+    """
+    if serves(name):
+        df = read(name)
+    else:
+        df = default.assign(semester=data.SEMESTER)
+    labels = df["Anno"].astype(str) + "/" + df["semester"].astype(str)
+    return df.assign(Anno=labels).drop(columns="semester")
+
+
+def _merge(name, anno, semester, part):
+    """Add or replace one partition in the frame and cubes this process holds."""
+    frame = data.loaded(name)
+    if frame is None:
+        # Nothing loaded yet: the next access reads the store including the new partition
+        return
+    updates = {}
+    current = data.loaded(name, "cube")
+    if semester == data.SEMESTER:
+        rows = part.drop(columns="semester")
+        frame = pd.concat([frame[frame["Anno"] != anno], rows], ignore_index=True)
+        frame = schema.compact(frame, name, float64=data.FLOAT64)
+        if current is not None:
+            updates["cube"] = current.with_period(anno, rows)
+    else:
+        # The default view holds one semester only and stays as it is
+        updates["cube"] = current
+    current = data.loaded(name, "cube_periods")
+    if current is not None:
+        updates["cube_periods"] = current.with_period(period(anno, semester), part)
+    # Cubes that could not be updated (a new Gemeinde, say) are rebuilt on the next access
+    data.replace(name, frame, {kind: value for kind, value in updates.items() if value is not None})
+    logger.info("%s: merged %s", name, period(anno, semester))
+
+
+def refresh(name):
+    """Merge partitions of `name` written since this process read the store.
+
+    Returns the merged (Anno, semester) keys. A removed partition cannot be
+    merged and invalidates the dataset instead.
+    """
+    with _seen_lock:
+        seen = dict(_seen.get(name, {}))
+    if not seen:
+        return []
+    found = partitions(name)
+    if seen.keys() - found.keys():
+        data.invalidate(name)
+        with _seen_lock:
+            _seen.pop(name, None)
+        return []
+    changed = [key for key, mtime in found.items() if seen.get(key) != mtime]
+    for anno, semester in changed:
+        _merge(name, anno, semester, data.prepare(name, _read_partition(name, anno, semester).to_pandas()))
+        with _seen_lock:
+            _seen[name][anno, semester] = found[anno, semester]
+    return changed
+
+
+def _read_file(path):
+    if path.suffix == ".csv":
+        return pd.read_csv(path)
+    if path.suffix in (".arrow", ".feather"):
+        return feather.read_feather(path)
+    return pd.read_excel(path)
+
+
+def ingest(name, df, semester, anno=None):
+    """Write `df`, the rows of one OMI release, as a new partition of `name`.
+
+    `anno` defaults to the single value of the `Anno` column. The first
+    ingest into an empty store seeds it from the bundled file, since the store
+    replaces that file as soon as it exists. In a process that holds the data
+    already, the partition is merged right away.
+    """
+    if name not in DATASETS:
+        raise KeyError(f"{name!r} has no partitioned store")
+    if anno is None:
+        years = df["Anno"].unique()
+        if len(years) != 1:
+            raise ValueError(f"expected the rows of one year, got {sorted(years)}")
+        anno = int(years[0])
+    # Anno comes from the partition, the Gemeinde key from `data.prepare`
+    missing = set(schema.SCHEMAS[name]) - {"Anno", "gemeinde_id"} - set(df.columns)
+    if missing:
+        raise ValueError(f"{name}: missing columns {sorted(missing)}")
+    df = data.prepare(name, df.assign(Anno=anno))
+    if not exists(name):
+        seed(name)
+    write_partition(name, anno, semester, df)
+    with _seen_lock:
+        seen = _seen.get(name)
+    if seen is not None:
+        refresh(name)
+    return path_for(name, anno, semester)
+
+
+def seed(name):
+    """Split the bundled xlsx file of `name` into partitions of `data.SEMESTER`."""
+    df = data.prepare(name, pd.read_excel(data.source(name)))
+    for anno, rows in df.groupby("Anno"):
+        write_partition(name, int(anno), data.SEMESTER, rows)
+    logger.info("%s: wrote %d partitions of semester %d", name, df["Anno"].nunique(), data.SEMESTER)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partitioned store of the OMI datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("seed", help="split the bundled xlsx files into partitions")
+    command.add_argument("names", nargs="*", default=DATASETS)
+    command = commands.add_parser("ingest", help="add the rows of one half-year")
+    command.add_argument("name", choices=DATASETS)
+    command.add_argument("file", type=Path)
+    command.add_argument("--semester", type=int, choices=(1, 2), required=True)
+    command.add_argument("--anno", type=int)
+    command = commands.add_parser("list", help="show the partitions")
+    command.add_argument("names", nargs="*", default=DATASETS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "seed":
+        for name in args.names:
+            seed(name)
+    elif args.command == "ingest":
+        print(ingest(args.name, _read_file(args.file), args.semester, args.anno))
+    else:
+        for name in args.names:
+            found = partitions(name)
+            print(f"{name:<12} {len(found):>3} partitions: {', '.join(period(*key) for key in found) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Overview of every Gemeinde in one WebGL chart, for the OMI pages.
+
+One `go.Scatter` per Gemeinde, as the comparison chart uses, would send more
+than a hundred traces. The overview instead packs all Gemeinden into a single
+`Scattergl` trace: each Gemeinde is one segment of the same length (one point
+per year plus a NaN that breaks the line), so segment `i` starts at
+`i * (years + 1)`. Positions, values and Gemeinde indexes are NumPy arrays of
+the smallest dtype, which plotly sends as base64 typed arrays instead of JSON
+number lists. The names travel once, in `layout.meta`.
+
+The chart is rendered by plotly.js in an HTML component rather than with
+`st.plotly_chart`, so hovering a line can redraw it as the highlight trace
+and the time plotly.js took to draw the chart can be shown. The component
+loads the plotly.js bundled with the plotly package from the static files of
+the app, where `plotly_js` writes it on first use, so the overview needs no
+third-party server.
+"""
+
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from statistik import geometrie
+
+
+logger = logging.getLogger(__name__)
+
+HEIGHT = 520
+
+_TEMPLATE = """<div id="uebersicht" style="height:{height}px"></div>
+<div id="uebersicht-info" style="font:12px sans-serif;color:#555"></div>
+{plotly_js}
+<script>
+const fig = {figure};
+const DTYPES = {{f4: Float32Array, f8: Float64Array, i1: Int8Array, i2: Int16Array, i4: Int32Array, u1: Uint8Array, u2: Uint16Array}};
+function decode(array) {{
+  if (!array || !array.bdata) return array;
+  const bytes = Uint8Array.from(atob(array.bdata), c => c.charCodeAt(0));
+  return new DTYPES[array.dtype](bytes.buffer);
+}}
+const x = decode(fig.data[0].x), y = decode(fig.data[0].y);
+const names = fig.layout.meta.gemeinden, size = fig.layout.meta.segment;
+const info = document.getElementById("uebersicht-info");
+const div = document.getElementById("uebersicht");
+const start = performance.now();
+Plotly.newPlot(div, fig.data, fig.layout, {{responsive: true, displaylogo: false}}).then(() => {{
+  const drawn = performance.now() - start;
+  info.textContent = `${{names.length}} Gemeinden, {payload} kB Daten, gezeichnet in ${{drawn.toFixed(0)}} ms`;
+  let current = -1;
+  div.on("plotly_hover", event => {{
+    const point = event.points[0];
+    if (point.curveNumber !== 0) return;
+    const i = Math.floor(point.pointIndex / size);
+    if (i === current) return;
+    current = i;
+    Plotly.restyle(div, {{
+      x: [Array.from(x.subarray(i * size, (i + 1) * size))],
+      y: [Array.from(y.subarray(i * size, (i + 1) * size))],
+      name: [names[i]],
+    }}, [2]);
+  }});
+}});
+</script>
+"""
+
+
+def chart(values, years, names, average, unit, title, value_format=".0f"):
+    """Figure of the (gemeinde, year) `values` of `names` and the yearly `average`.
+
+    Hover labels show the values in the d3 format `value_format` with `unit`.
+
+    Trace 0 holds all Gemeinden, trace 1 the average and trace 2, empty at
+    first, the hovered Gemeinde.
+    """
+    import plotly.graph_objs as go
+
+    count, n = values.shape
+    segment = n + 1
+    positions = np.tile(np.arange(segment, dtype=np.int16), count)
+    positions[n::segment] = n - 1
+    lines = np.hstack([values, np.full((count, 1), np.nan)]).astype(np.float32).ravel()
+
+    fig = go.Figure([
+        go.Scattergl(
+            x=positions,
+            y=lines,
+            mode="lines",
+            line=dict(width=1, color="rgba(117, 63, 10, 0.25)"),
+            connectgaps=False,
+            name="Gemeinden",
+            hovertemplate=f"%{{y:{value_format}}} {unit}<extra></extra>",
+        ),
+        go.Scattergl(
+            x=np.arange(n, dtype=np.int16),
+            y=average.astype(np.float32),
+            mode="lines",
+            line=dict(width=3, color="black"),
+            name="Durchschnitt Gemeinden",
+            hovertemplate=f"Durchschnitt: %{{y:{value_format}}} {unit}<extra></extra>",
+        ),
+        go.Scattergl(
+            x=[],
+            y=[],
+            mode="lines+markers",
+            line=dict(width=3, color="#d62728"),
+            name="",
+            hovertemplate=f"%{{fullData.name}}: %{{y:{value_format}}} {unit}<extra></extra>",
+        ),
+    ])
+    fig.update_layout(
+        template="none",
+        title=title,
+        height=HEIGHT,
+        hovermode="closest",
+        xaxis=dict(title="Jahr", tickmode="array", tickvals=list(range(n)), ticktext=[str(year) for year in years]),
+        yaxis=dict(title=unit),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5),
+        margin=dict(l=60, r=20, t=50, b=80),
+        meta=dict(gemeinden=list(names), segment=segment),
+    )
+    return fig
+
+
+def plotly_js():
+    """Script element that loads the bundled plotly.js from the static files of the app.
+
+    The file is named after the plotly.js version and written to
+    `geometrie.STATIC_DIR` if it is not there yet. If the directory is not
+    writable, the script is inlined instead.
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    name = f"plotly-{get_plotlyjs_version()}.min.js"
+    path = geometrie.STATIC_DIR / name
+    if not path.exists():
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Renamed into place so that no session is served a partly written file
+            partial = path.with_name(f"{name}.{os.getpid()}-{threading.get_ident()}.tmp")
+            partial.write_text(get_plotlyjs(), encoding="utf-8")
+            partial.replace(path)
+        except OSError as exc:
+            logger.warning("plotly.js not written to %s, inlined instead: %s", path, exc)
+            return f"<script>{get_plotlyjs()}</script>"
+    return f'<script src="app/static/{name}"></script>'
+
+
+def html(fig):
+    """(HTML of the component that draws `fig`, size of the figure JSON in bytes)."""
+    figure = fig.to_json()
+    payload = len(figure.encode())
+    # Keep the JSON from closing the script element
+    figure = figure.replace("</", "<\\/")
+    page = _TEMPLATE.format(height=HEIGHT, plotly_js=plotly_js(), figure=figure, payload=json.dumps(round(payload / 1024, 1)))
+    return page, payload
@@ -0,0 +1,139 @@
+"""Selections of the pages as query parameters, so that a link opens the same view.
+
+A page calls `begin` at the top, `seed` before each widget it wants in the
+URL (the widget then gets the seeded key and no `index`), and `finish` at the
+end. `seed` takes the value from the query parameters when a session opens
+the page, and falls back to the default when the value is unknown or no
+longer among the options. `finish` writes the current selection back to the
+URL, so the address bar always holds a link to the view on screen:
+
+    ?typ=Privatwohnungen&zone=Zentral&zustand=Normal&gemeinde=Bozen&gemeinde=Meran&gemeinde=Brixen
+
+The figures of a view are cached process-wide in `charts.FIGURES`, keyed by
+the normalised selection, with a TTL (`STATISTIK_CACHE_TTL`, default one
+hour) and a size limit. `source` labels the cache accesses of the first run
+of a session opened from a link as "link" and all other runs as "app", and
+`finish` shows the hit rates of both in the sidebar.
+"""
+
+import threading
+
+
+# Query parameters that are not part of a selection
+IGNORED = ("debug",)
+
+_local = threading.local()
+_SEEN = "_urlstate_seen"
+
+
+def source():
+    """Where the current run's requests come from: "link", "app", or "intern" outside a page."""
+    return getattr(_local, "source", "intern")
+
+
+def _url_values(name):
+    import streamlit as st
+
+    return st.query_params.get_all(name)
+
+
+def begin():
+    """Mark the run as opened from a link if it is the first of a session with a selection in the URL."""
+    import streamlit as st
+
+    first = _SEEN not in st.session_state
+    st.session_state[_SEEN] = True
+    from_link = first and any(name not in IGNORED for name in st.query_params)
+    _local.source = "link" if from_link else "app"
+    _local.first = first
+
+
+def _matching(values, options):
+    by_text = {str(option): option for option in options}
+    return [by_text[value] for value in values if value in by_text]
+
+
+def seed(key, options, default, param=None, position=0):
+    """Put the initial value of the widget `key` into the session state.
+
+    The value is the `position`-th value of the query parameter `param`
+    (default: `key`) if it is one of `options`, else `default`. A value kept
+    from an earlier run that is no longer among the options is replaced by
+    `default` as well.
+    """
+    import streamlit as st
+
+    options = list(options)
+    if key in st.session_state:
+        if st.session_state[key] not in options:
+            st.session_state[key] = default
+        return
+    values = _matching(_url_values(param or key), options) if getattr(_local, "first", False) else []
+    st.session_state[key] = values[position] if position < len(values) else default
+
+
+def seed_flag(key, default=False, param=None):
+    """`seed` for a checkbox: true if the query parameter is "1"."""
+    import streamlit as st
+
+    if key in st.session_state:
+        return
+    values = _url_values(param or key) if getattr(_local, "first", False) else []
+    st.session_state[key] = values[-1] == "1" if values else default
+
+
+def default_at(options, index):
+    """The option at `index`, or the last one if there are fewer; None without options."""
+    options = list(options)
+    return options[min(index, len(options) - 1)] if options else None
+
+
+def _encoded(value):
+    if isinstance(value, bool):
+        return "1" if value else None
+    return None if value is None else str(value)
+
+
+def finish(params):
+    """Write the selection to the URL and show the cache statistics.
+
+    `params` maps each query parameter to the key of its widget, or to a
+    tuple of keys for a parameter with several values.
+    """
+    import streamlit as st
+
+    wanted = {name: st.query_params.get_all(name) for name in IGNORED if name in st.query_params}
+    for name, keys in params.items():
+        values = [_encoded(st.session_state.get(key)) for key in (keys if isinstance(keys, tuple) else (keys,))]
+        values = [value for value in values if value is not None]
+        if values:
+            wanted[name] = values
+    current = {name: st.query_params.get_all(name) for name in st.query_params}
+    # Setting the parameters does not rerun the page; skip it when nothing changed
+    if current != wanted:
+        st.query_params.from_dict(wanted)
+    _panel()
+
+
+def _rate(counts):
+    total = counts["hits"] + counts["misses"]
+    return f"{counts['hits'] / total:.0%} von {total}" if total else "-"
+
+
+def _panel():
+    import streamlit as st
+
+    from statistik import charts
+
+    stats = charts.FIGURES.stats()
+    sources = stats["sources"]
+    with st.sidebar.expander("Cache", expanded=False):
+        st.caption(
+            f"{stats['size']}/{stats['maxsize']} Diagramme, gültig {stats['ttl'] / 60:.0f} min. "
+            f"{stats['hits']} Treffer, {stats['misses']} neu erstellt, "
+            f"{stats['expired']} abgelaufen, {stats['evicted']} verdrängt."
+        )
+        st.caption(
+            f"Aus dem Cache: geteilte Links {_rate(sources.get('link', {'hits': 0, 'misses': 0}))}, "
+            f"Bedienung der Seiten {_rate(sources.get('app', {'hits': 0, 'misses': 0}))}."
+        )
@@ -0,0 +1,158 @@
+"""Load and index every dataset before the first session needs it.
+
+`start` runs the warm-up once per process in a background thread: stale
+snapshots are rebuilt from the xlsx files in parallel worker processes
+(parsing is CPU-bound; spawned, since forking a threaded server can deadlock),
+then all datasets are loaded concurrently and their cubes, averages and
+rankings built. plotly is imported in the same pass, off
+the critical path of the first page run. `status` reports what is ready.
+
+`run.py` calls `start` before the Streamlit server accepts connections; the
+pages call it as well, so a server started with `streamlit run` warms all
+datasets on the first visit to any page. Both also start the polling for new
+versions of the data in `statistik.refresh`.
+
+    python -m statistik.warmup    # warm up in the foreground and print the timings
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from statistik import cube, data
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_thread = None
+_status = {"started": None, "finished": None, "ready": {}, "errors": {}}
+
+
+def _stale_snapshots():
+    from statistik import snapshot
+
+    stale = []
+    for name in data.DATASETS:
+        src = data.source(name)
+        if isinstance(src, Path) and not snapshot.is_fresh(name, src, data.snapshot_version()):
+            stale.append(name)
+    return stale
+
+
+def _convert(name):
+    from statistik import snapshot
+
+    snapshot.convert(name)
+    return name
+
+
+def _rebuild_snapshots(names):
+    # Spawned, not forked: the warm-up runs in a thread of the multi-threaded server,
+    # and a forked child could inherit a lock another thread holds
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=len(names), mp_context=context) as pool:
+            list(pool.map(_convert, names))
+    except OSError as exc:
+        # Read-only checkout or no worker processes: the loads below parse the xlsx files
+        logger.warning("could not rebuild snapshots: %s", exc)
+
+
+def _warm(name):
+    start = time.perf_counter()
+    data.load(name)
+    if name in cube.VALUE_COLUMNS:
+        cube.get(name)
+    return name, time.perf_counter() - start
+
+
+def _import_plotly():
+    start = time.perf_counter()
+    import plotly.graph_objs  # noqa: F401
+    return "plotly", time.perf_counter() - start
+
+
+def warm_up():
+    """Load every dataset and build its indexes; returns `status()` when done."""
+    _status["started"] = time.time()
+    stale = _stale_snapshots()
+    if stale:
+        _rebuild_snapshots(stale)
+
+    with ThreadPoolExecutor(max_workers=len(data.DATASETS) + 1) as pool:
+        futures = [pool.submit(_warm, name) for name in data.DATASETS]
+        futures.append(pool.submit(_import_plotly))
+        for name, future in zip((*data.DATASETS, "plotly"), futures):
+            try:
+                _, seconds = future.result()
+                _status["ready"][name] = seconds
+            except Exception as exc:
+                logger.exception("warm-up of %s failed", name)
+                _status["errors"][name] = repr(exc)
+
+    _status["finished"] = time.time()
+    logger.info("warm-up finished in %.2f s", _status["finished"] - _status["started"])
+    return status()
+
+
+def start():
+    """Start the warm-up in a background thread, once per process.
+
+    The polling of `statistik.refresh` starts with it and waits for it to finish.
+    """
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm_up, name="statistik-warmup", daemon=True)
+            _thread.start()
+            from statistik import refresh
+
+            refresh.start()
+    return _thread
+
+
+def wait(timeout=None):
+    """Block until the warm-up started by `start` has finished."""
+    thread = start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def status():
+    """Which datasets are ready, how long each took and whether the warm-up is done."""
+    started, finished = _status["started"], _status["finished"]
+    return {
+        "done": finished is not None,
+        "seconds": (finished or time.time()) - started if started else None,
+        "ready": dict(_status["ready"]),
+        "errors": dict(_status["errors"]),
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    start_time = time.perf_counter()
+    result = warm_up()
+    ready = time.perf_counter() - start_time
+
+    from statistik import charts, omi
+
+    dataset = omi.PREISE
+    selection = (omi.TYPEN["Privatwohnungen"], omi.ZONEN["Zentral"], omi.ZUSTAENDE["Normal"])
+    chart_start = time.perf_counter()
+    charts.omi_figures(dataset, *selection, omi.gemeinden(dataset, *selection)[:3])
+    first_chart = time.perf_counter() - chart_start
+
+    for name, seconds in result["ready"].items():
+        print(f"{name:<12} {seconds * 1000:>8.1f} ms")
+    for name, error in result["errors"].items():
+        print(f"{name:<12} failed: {error}")
+    print(f"ready after {ready * 1000:.1f} ms, first chart after {(ready + first_chart) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import pytest
+
+from statistik import data, store
+
+
+@pytest.fixture
+def empty_store(tmp_path, monkeypatch):
+    """An empty partitioned store in a temporary directory instead of `data/store/`."""
+    monkeypatch.setattr(store, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(store, "_seen", {})
+    data.invalidate()
+    yield tmp_path / "store"
+    data.invalidate()
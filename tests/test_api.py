@@ -0,0 +1,55 @@
+"""Queries of the API, answered by `api.respond` without a server."""
+
+import json
+from http import HTTPStatus
+
+import pytest
+
+from statistik import api
+
+
+RANKING = "/api/omi/preise/ranking"
+
+
+def query(path, **params):
+    status, body, _, _ = api.respond(path, {name: [str(value)] for name, value in params.items()}, "json")
+    return status, json.loads(body)
+
+
+def test_ranking_returns_k_rows():
+    status, rows = query(RANKING, k=3)
+    assert status == HTTPStatus.OK
+    assert [row["Rang"] for row in rows] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("k", [0, -2, "drei"])
+def test_ranking_rejects_invalid_k(k):
+    status, body = query(RANKING, k=k)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "k must be" in body["error"]
+
+
+def test_ranking_by_growth():
+    status, rows = query(RANKING, spanne=1)
+    assert status == HTTPStatus.OK
+    assert rows and all("%" in name for name in rows[0] if name not in ("Rang", "Gemeinde", "Jahr"))
+
+
+@pytest.mark.parametrize("span", [0, -1, 1000])
+def test_ranking_rejects_spans_without_base_year(span):
+    status, body = query(RANKING, spanne=span)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "spanne must be between 1 and" in body["error"]
+
+
+def test_growth_needs_a_positive_span():
+    from statistik import cube
+
+    with pytest.raises(ValueError):
+        cube.get("preise_df").growth(0)
+
+
+def test_growth_ranking_of_half_years_is_a_bad_request():
+    status, body = query(RANKING, spanne=1, halbjahre="beide")
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "halbjahre=beide" in body["error"]
@@ -0,0 +1,26 @@
+"""The process-wide dataset registry."""
+
+from statistik import data
+
+
+NAME = "all_region"
+
+
+def test_value_built_from_a_replaced_frame_is_built_again():
+    data.invalidate(NAME)
+    builds = []
+
+    def build(df):
+        builds.append(len(df))
+        if len(builds) == 1:
+            # A refresh swapping in new data while the value is being built
+            data.replace(NAME, df.head(3))
+        return len(df)
+
+    try:
+        assert data.derived(NAME, "rows", build) == 3
+        # Once from the old frame, once from the replacement
+        assert len(builds) == 2 and builds[0] > 3 and builds[1] == 3
+        assert data.loaded(NAME, "rows") == 3
+    finally:
+        data.invalidate(NAME)
@@ -0,0 +1,17 @@
+"""Gemeinde keys of the dataset rows."""
+
+import pandas as pd
+
+from statistik import gemeinden
+
+
+def test_only_alias_rows_that_duplicate_their_gemeinde_are_dropped():
+    df = pd.DataFrame({
+        "gemeinde_de": ["Kastelruth", "Seis", "Seis", "Bozen", "Bozen"],
+        "Compr_medio": [1000, 1000, 1200, 3000, 3000],
+    })
+    result = gemeinden.assign_keys("preise_df", df)
+    # Seis with the value of Kastelruth goes; the identical rows of Bozen stay
+    assert result["gemeinde_de"].tolist() == ["Kastelruth", "Kastelruth", "Bozen", "Bozen"]
+    assert result["Compr_medio"].tolist() == [1000, 1200, 3000, 3000]
+    assert result["gemeinde_id"].nunique() == 2
@@ -0,0 +1,59 @@
+"""The streaming importer against a plain read of a small export fixture."""
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+from statistik import cube, data, gemeinden, importer, store
+
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "QI_0000_1_20991_VALORI.csv"
+
+
+def expected(name):
+    (low, high), columns, decimals = importer.TARGETS[name]
+    df = pd.read_csv(FIXTURE, sep=";", decimal=",", encoding="latin-1", skiprows=1, dtype={"Comune_ISTAT": str})
+    table = gemeinden.table()
+    names = dict(zip(table["istat"].astype(int), table["gemeinde_de"]))
+    df = df.assign(
+        gemeinde_de=df["Comune_ISTAT"].astype(int).map(names),
+        Stato=df["Stato"].str.strip().str.upper(),
+        Fascia=df["Fascia"].str.strip(),
+    ).dropna(subset=["gemeinde_de", low, high])
+    df[columns[0]], df[columns[1]], df[columns[2]] = df[low], (df[low] + df[high]) / 2, df[high]
+    return df.groupby(importer.KEYS)[list(columns)].mean().round(decimals).reset_index()
+
+
+@pytest.mark.parametrize("name", sorted(importer.TARGETS))
+@pytest.mark.parametrize("chunksize", [5, 1000])
+def test_partial_sums_match_a_plain_groupby(name, chunksize):
+    frames, rows_read = importer.read_export(FIXTURE, chunksize=chunksize)
+    assert rows_read == 83
+    got = frames[name].sort_values(importer.KEYS).reset_index(drop=True)
+    want = expected(name).sort_values(importer.KEYS).reset_index(drop=True)
+    # Only the comuni of the Gemeinde dimension, not Torino or Trento
+    assert set(got["gemeinde_de"]) == {"Bozen", "Meran", "Bruneck"}
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+
+def test_period_from_the_file_name():
+    assert importer.period_of(FIXTURE) == (2099, 1)
+
+
+@pytest.mark.parametrize("semester", [1, 2])
+def test_imported_partitions_are_read_with_the_seeded_ones(empty_store, semester):
+    importer.import_export(FIXTURE, anno=2099, semester=semester)
+    for name in importer.TARGETS:
+        years = data.load(name)["Anno"]
+        # The first import seeds the store from the bundled file
+        assert years.nunique() > 1
+        assert (2099 in set(years)) == (semester == data.SEMESTER)
+        periods = cube.get(name, both_semesters=True).years.tolist()
+        assert f"2099/{semester}" in periods
+        assert f"{years.min()}/{data.SEMESTER}" in periods
+        # Written in the same column order as the seeded partitions
+        imported = feather.read_table(store.path_for(name, 2099, semester)).schema
+        seeded = feather.read_table(store.path_for(name, int(years.min()), data.SEMESTER)).schema
+        assert imported.names == seeded.names
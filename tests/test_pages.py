@@ -0,0 +1,45 @@
+"""Headless smoke tests of the two OMI pages with Streamlit's AppTest."""
+
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = [ROOT / "Immobilienpreise.py", ROOT / "pages" / "Mietpreise.py"]
+
+
+def run(page, **params):
+    at = AppTest.from_file(str(page), default_timeout=120)
+    for name, value in params.items():
+        at.query_params[name] = value
+    return at.run()
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.stem)
+def test_default_view(page):
+    at = run(page)
+    assert not at.exception
+    # Line chart and both ranking tables
+    assert len(at.get("plotly_chart")) == 3
+    assert at.selectbox(key="gemeinde1").value != at.selectbox(key="gemeinde2").value
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.stem)
+def test_every_selector_combination(page):
+    at = run(page)
+    for typ in at.selectbox(key="typ").options:
+        for zone in at.selectbox(key="zone").options:
+            at.selectbox(key="typ").set_value(typ)
+            at.selectbox(key="zone").set_value(zone).run()
+            assert not at.exception, (typ, zone)
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.stem)
+def test_selection_from_url(page):
+    at = run(page, typ="Büros", zone="Zentral", gemeinde=["Meran", "Bozen"])
+    assert not at.exception
+    assert at.selectbox(key="typ").value == "Büros"
+    assert at.selectbox(key="gemeinde1").value == "Meran"
+    assert at.selectbox(key="gemeinde2").value == "Bozen"
@@ -0,0 +1,125 @@
+"""Background refresh against a local stand-in for raw.githubusercontent.com."""
+
+import hashlib
+import shutil
+import threading
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from statistik import cube, data, refresh
+
+
+NAME = "all_region"
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """Serves the files of `directory` with an ETag and a Last-Modified header, like GitHub."""
+
+    directory = None
+    statuses = []
+
+    def do_GET(self):
+        path = self.directory / self.path.lstrip("/")
+        if not path.is_file():
+            self._reply(HTTPStatus.NOT_FOUND)
+            return
+        body = path.read_bytes()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self._reply(HTTPStatus.NOT_MODIFIED, etag=etag)
+        else:
+            self._reply(HTTPStatus.OK, body, etag, formatdate(path.stat().st_mtime, usegmt=True))
+
+    def _reply(self, status, body=b"", etag=None, last_modified=None):
+        self.statuses.append(status)
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    """A copy of the bundled files on a local server; yields the directory and the response statuses."""
+    for path in data.DATA_DIR.glob("*.xlsx"):
+        shutil.copy(path, tmp_path)
+    handler = type("Handler", (Upstream,), {"directory": tmp_path, "statuses": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(data, "REMOTE_URL", f"http://127.0.0.1:{server.server_port}/{{name}}.xlsx")
+    monkeypatch.setattr(refresh, "_state", {})
+    data.invalidate()
+    yield tmp_path, handler.statuses
+    server.shutdown()
+    data.invalidate()
+
+
+def test_unchanged_file_is_not_swapped_in(upstream):
+    _, statuses = upstream
+    data.load(NAME)
+    before = data.version(NAME)
+
+    # No validators yet: the file is downloaded, but equals the loaded one
+    assert refresh.check(NAME) is False
+    # From now on the server answers with 304
+    assert refresh.check(NAME) is False
+    assert statuses == [HTTPStatus.OK, HTTPStatus.NOT_MODIFIED]
+    assert data.version(NAME) == before
+
+
+def test_changed_file_is_swapped_in(upstream):
+    directory, statuses = upstream
+    original = data.load(NAME)
+    refresh.check(NAME)
+    before = data.version(NAME)
+
+    changed = pd.read_excel(directory / f"{NAME}.xlsx")
+    changed["medio_fabbricati"] += 1
+    changed.to_excel(directory / f"{NAME}.xlsx", index=False)
+
+    assert refresh.check(NAME) is True
+    assert data.version(NAME) == before + 1
+    assert (data.load(NAME)["medio_fabbricati"] == original["medio_fabbricati"] + 1).all()
+    # The new file's validators are sent from now on
+    assert refresh.check(NAME) is False
+    assert statuses == [HTTPStatus.OK, HTTPStatus.OK, HTTPStatus.NOT_MODIFIED]
+
+
+def test_cube_is_swapped_in_with_the_frame(upstream):
+    directory, _ = upstream
+    name = "mietpreise"
+    old = cube.get(name)
+    refresh.check(name)
+
+    changed = pd.read_excel(directory / f"{name}.xlsx")
+    changed = changed[changed["Anno"] != changed["Anno"].max()]
+    changed.to_excel(directory / f"{name}.xlsx", index=False)
+
+    assert refresh.check(name) is True
+    # Built before the swap, not on the next access
+    new = data.loaded(name, "cube")
+    assert new is not None and new is not old
+    assert len(new.years) == len(old.years) - 1
+
+
+def test_failed_request_keeps_the_data(upstream):
+    directory, _ = upstream
+    data.load(NAME)
+    before = data.version(NAME)
+    (directory / f"{NAME}.xlsx").unlink()
+
+    assert refresh.check_all() == []
+    assert "404" in refresh.status()[NAME]["error"]
+    assert data.version(NAME) == before
@@ -0,0 +1,48 @@
+"""The partitioned store on a temporary directory instead of `data/store/`."""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from statistik import data, store
+
+
+NAME = "preise_df"
+
+
+def release(anno):
+    """Rows of one new year, copied from the last year of the bundled data."""
+    df = pd.read_excel(data.source(NAME))
+    return df[df["Anno"] == df["Anno"].max()].assign(Anno=anno)
+
+
+def test_first_ingest_keeps_the_history(empty_store):
+    bundled = data.load(NAME)
+    store.ingest(NAME, release(2099), semester=data.SEMESTER)
+    data.invalidate(NAME)
+    years = set(data.load(NAME)["Anno"])
+    assert years == set(bundled["Anno"]) | {2099}
+
+
+def test_store_without_the_default_semester_is_not_read(empty_store):
+    bundled = data.load(NAME)
+    store.write_partition(NAME, 2099, 1, data.prepare(NAME, release(2099)))
+    assert store.exists(NAME) and not store.serves(NAME)
+    data.invalidate(NAME)
+    assert len(data.load(NAME)) == len(bundled)
+
+
+def test_partitions_of_an_older_schema_are_read_with_the_others(empty_store):
+    store.seed(NAME)
+    # Written before the Gemeinde key and float32 values, with the columns in another order
+    old = data.prepare(NAME, release(2099)).drop(columns=["Anno", "gemeinde_id"])
+    old = old[old.columns[::-1]].astype({column: "float64" for column in ("Compr_min", "Compr_medio", "Compr_max")})
+    target = store.path_for(NAME, 2099, data.SEMESTER)
+    target.parent.mkdir(parents=True)
+    feather.write_feather(pa.Table.from_pandas(old, preserve_index=False), target)
+
+    df = data.load(NAME)
+    rows = df[df["Anno"] == 2099]
+    assert len(rows) == len(old)
+    assert (rows["gemeinde_id"] >= 0).all()
+    assert df["Compr_medio"].dtype == "float32"
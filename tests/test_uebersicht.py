@@ -0,0 +1,25 @@
+"""The WebGL overview of all Gemeinden."""
+
+import numpy as np
+import pytest
+from plotly.offline import get_plotlyjs_version
+
+from statistik import charts, geometrie, omi, uebersicht
+
+
+@pytest.mark.parametrize("dataset", [omi.PREISE, omi.MIETEN], ids=lambda dataset: dataset.name)
+def test_hover_labels_use_the_unit_and_format_of_the_dataset(dataset):
+    html, payload = charts.overview(dataset, omi.TYPEN["Privatwohnungen"], omi.ZONEN["Zentral"], omi.ZUSTAENDE["Normal"])
+    assert payload > 0
+    assert f"%{{y:{dataset.value_format}}}" in html
+    assert dataset.unit.replace("/", "\\u002f") in html
+
+
+def test_plotly_js_is_served_from_the_static_files_of_the_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometrie, "STATIC_DIR", tmp_path)
+    html, _ = uebersicht.html(uebersicht.chart(np.ones((2, 3)), [2020, 2021, 2022], ["A", "B"], np.ones(3), "€", "Titel"))
+    name = f"plotly-{get_plotlyjs_version()}.min.js"
+    assert f'<script src="app/static/{name}"></script>' in html
+    assert "cdn.plot.ly" not in html
+    assert (tmp_path / name).stat().st_size > 1_000_000
+    assert [path.name for path in tmp_path.iterdir()] == [name]